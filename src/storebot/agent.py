@@ -1,16 +1,21 @@
+import copy
+import functools
 import json
 import logging
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from decimal import Decimal, ROUND_HALF_UP
+from typing import TYPE_CHECKING
 
-import anthropic
 from sqlalchemy.orm import Session
 
 from storebot.config import get_settings
 from storebot.db import ApiUsage, TraderaCategory
 from storebot.tools.definitions import TOOLS, TOOL_CATEGORIES
 from storebot.tools.dispatch import (
+    bind_handlers,
     create_services,
     execute_tool as _dispatch_execute_tool,
     strip_nulls as _strip_nulls,
@@ -18,6 +23,9 @@ from storebot.tools.dispatch import (
 from storebot.tools.image import encode_image_base64
 from storebot.tools.schemas import validate_tool_result
 
+if TYPE_CHECKING:
+    import anthropic
+
 logger = logging.getLogger(__name__)
 
 # Tools that benefit from self-critique. A reflection instruction is appended
@@ -29,6 +37,36 @@ REFLECTION_TOOLS: set[str] = {
     "create_sale_voucher",
 }
 
+# Tools with external side effects (Tradera, PostNord, order state). They are
+# never run concurrently with each other, so two in the same turn apply in the
+# order Claude emitted them.
+SERIAL_TOOLS: frozenset[str] = frozenset(
+    {
+        "publish_listing",
+        "relist_product",
+        "end_tradera_listing",
+        "update_tradera_listing_price",
+        "create_shipping_label",
+        "mark_order_shipped",
+        "leave_feedback",
+    }
+)
+
+# Read-only tools backed by slow external searches, with how long (seconds) a
+# result may be reused for an identical input. Error results are not cached.
+# price_check is left out: it logs an audit action per call when given a
+# product_id, and reports per-source failures inside nested sections.
+CACHEABLE_TOOL_TTL: dict[str, int] = {
+    "search_tradera": 600,
+    "search_blocket": 600,
+    "get_blocket_ad": 300,
+    "get_attribute_definitions": 86400,
+    "get_shipping_types": 86400,
+    # Category tree only changes when synced from Tradera
+    "get_categories": 3600,
+}
+_TOOL_CACHE_MAX_ENTRIES = 1024
+
 # "Review: check accuracy, completeness, and reasonableness before
 # presenting the result to the owner."
 _REFLECTION_PROMPT = (
@@ -69,11 +107,26 @@ _MODEL_PRICING = {
         "cache_read": Decimal("0.10"),
     },
 }
+# The API expects streaming for requests whose response could run past 10
+# minutes, and the SDK refuses a blocking create() for them: above 21,333
+# max_tokens for any model, and above 8,192 for Claude Opus 4 and 4.1. Calls
+# over these limits stream instead.
+_NON_STREAMING_MAX_TOKENS = 21_333
+_OPUS_4_NON_STREAMING_MAX_TOKENS = 8_192
+_OPUS_4_MODEL_PREFIXES = ("claude-opus-4-0", "claude-opus-4-1", "claude-opus-4-2025")
+
 _USD_TO_SEK = Decimal("10.5")
 _ONE_MILLION = Decimal("1000000")
 _COST_QUANTIZE = Decimal("0.0001")
 
 
+def _requires_streaming(model: str, max_tokens: int) -> bool:
+    """Whether max_tokens is too large for a blocking create() with this model."""
+    if model.startswith(_OPUS_4_MODEL_PREFIXES):
+        return max_tokens > _OPUS_4_NON_STREAMING_MAX_TOKENS
+    return max_tokens > _NON_STREAMING_MAX_TOKENS
+
+
 def _json_default(o: object) -> object:
     """JSON encoder fallback — converts Decimal (from zeep SOAP) to float."""
     if isinstance(o, Decimal):
@@ -81,6 +134,24 @@ def _json_default(o: object) -> object:
     raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
 
 
+# Shared encoder for tool_result payloads: compact separators cut billable
+# tokens, and reusing one instance skips per-call encoder construction.
+_encode_tool_result = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(",", ":"),
+    check_circular=False,
+    default=_json_default,
+).encode
+
+# Canonical form of a tool input for the read-only tool cache key.
+_encode_cache_key = json.JSONEncoder(
+    sort_keys=True,
+    separators=(",", ":"),
+    check_circular=False,
+    default=str,
+).encode
+
+
 def _estimate_cost_sek(
     model: str,
     input_tokens: int,
@@ -193,12 +264,19 @@ Om du behöver verktyg som inte är tillgängliga, använd request_tools för at
 Svara alltid på svenska om inte användaren skriver på engelska. Var kortfattad och tydlig.
 Alla annonser och produktbeskrivningar ska vara på svenska."""
 
+# System blocks sent with every agent call, built once. The cache breakpoint
+# lets the prompt be read from cache (5-min TTL, ~90% cost reduction).
+_SYSTEM_BLOCKS: list[dict] = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+]
+
 
 _COMPACT_SYSTEM_PROMPT = (
     "Du sammanfattar konversationshistorik för en AI-assistent som hanterar en svensk lanthandel. "
     "Bevara ALLA: produkt-ID, order-nummer, annons-ID, väntande beslut, priser, datum och nyckelkontext. "
     "Skriv på svenska. Var kortfattad men missa inget viktigt."
 )
+_COMPACT_SYSTEM_BLOCKS: list[dict] = [{"type": "text", "text": _COMPACT_SYSTEM_PROMPT}]
 
 
 # Categories requiring the capable model for accuracy (financial, creative).
@@ -324,31 +402,116 @@ def _detect_categories(messages: list[dict], active_categories: set[str]) -> set
     return cats
 
 
+# TOOLS paired with their category and stripped of the internal ``category``
+# key, built once at import instead of on every API call.
+_API_TOOLS: tuple[tuple[str, dict], ...] = tuple(
+    (t.get("category", "core"), {k: v for k, v in t.items() if k != "category"}) for t in TOOLS
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _filtered_tools_for(categories: frozenset[str]) -> tuple[dict, ...]:
+    tools = [t for category, t in _API_TOOLS if category in categories]
+    if tools:
+        tools[-1] = {**tools[-1], "cache_control": {"type": "ephemeral"}}
+    return tuple(tools)
+
+
 def _get_filtered_tools(categories: set[str]) -> list[dict]:
     """Return tool definitions for the given categories.
 
     Strips the internal ``category`` key and sets ``cache_control`` on the
-    last tool for prompt caching.
+    last tool for prompt caching. The result for each category set is
+    memoized, so repeated turns reuse the same tool dicts.
     """
-    tools = []
-    for t in TOOLS:
-        if t.get("category", "core") in categories:
-            tools.append({k: v for k, v in t.items() if k != "category"})
-    if tools:
-        tools[-1] = {**tools[-1], "cache_control": {"type": "ephemeral"}}
-    return tools
+    return list(_filtered_tools_for(frozenset(categories)))
+
+
+def _cache_marked(message: dict) -> dict:
+    """Return a copy of ``message`` with ``cache_control`` on its final block.
+
+    Returns the message unchanged when its last block cannot carry a
+    breakpoint (empty text, or SDK content objects from the current turn).
+    """
+    content = message.get("content")
+    if isinstance(content, str):
+        if not content:
+            return message
+        blocks = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content and isinstance(content[-1], dict):
+        blocks = list(content)
+    else:
+        return message
+    tail = blocks[-1]
+    if tail.get("type") == "text" and not tail.get("text"):
+        return message  # the API rejects cache_control on empty text blocks
+    blocks[-1] = {**tail, "cache_control": {"type": "ephemeral"}}
+    return {**message, "content": blocks}
+
+
+def _with_cache_breakpoints(messages: list[dict], history_len: int = 0) -> list[dict]:
+    """Return ``messages`` with prompt-cache breakpoints for the API request.
+
+    The final message is always marked: within a tool loop every call resends
+    the whole conversation, and the next hop reads everything up to the tail
+    from cache. When ``history_len`` is given, the last message of the stored
+    history is marked too, so the next user turn can reuse this turn's
+    history prefix. Together with the system prompt and tools this uses all
+    four breakpoints the API allows. Only marked messages are copied, so the
+    caller's history (which gets persisted) is left untouched.
+    """
+    if not messages:
+        return messages
+    marked = list(messages)
+    marked[-1] = _cache_marked(marked[-1])
+    if 0 < history_len < len(marked):
+        marked[history_len - 1] = _cache_marked(marked[history_len - 1])
+    return marked
 
 
 class Agent:
     def __init__(self, settings=None, engine=None):
         self.settings = settings or get_settings()
         self.engine = engine
-        self.client = anthropic.Anthropic(api_key=self.settings.claude_api_key)
         self._services = create_services(self.settings, self.engine)
         # Expose individual services as attributes for backward compatibility
         # (used by get_categories, handle_message, and scheduled jobs)
         for attr, svc in self._services.items():
             setattr(self, attr, svc)
+        self._handlers = bind_handlers(self._services)
+        # get_categories reads the local category table before calling Tradera.
+        self._handlers["get_categories"] = self._get_categories_tool
+        self._serial_tool_lock = threading.Lock()
+        # Long-lived so the per-thread HTTP sessions in the Tradera and Blocket
+        # clients keep their connections from one turn to the next.
+        self._tool_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="storebot-tool")
+        self._tool_cache: dict[tuple[str, str], tuple[float, dict]] = {}
+        self._tool_cache_lock = threading.Lock()
+        self._client_lock = threading.Lock()
+
+    @functools.cached_property
+    def _anthropic(self):
+        """The anthropic SDK module, imported on first use.
+
+        It takes over a second to import, and CLI commands and scheduled jobs
+        that never call Claude should not pay for it.
+        """
+        import anthropic
+
+        return anthropic
+
+    @functools.cached_property
+    def client(self) -> "anthropic.Anthropic":
+        """Claude API client, built on first use (creates an httpx pool + TLS context)."""
+        # cached_property does not lock (3.12+), and the first call can come
+        # from several tool or job threads at once; build exactly one client.
+        with self._client_lock:
+            client = self.__dict__.get("client")
+            if client is None:
+                client = self.__dict__["client"] = self._anthropic.Anthropic(
+                    api_key=self.settings.claude_api_key
+                )
+            return client
 
     def _select_model(self, categories: set[str], has_images: bool) -> str:
         """Select model based on task complexity.
@@ -371,29 +534,25 @@ class Agent:
         return simple
 
     def _call_api(
-        self, messages: list[dict], tools: list[dict] | None = None, model: str | None = None
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        model: str | None = None,
+        history_len: int = 0,
     ):
         """Send messages to Claude and return the response."""
         logger.debug(
             "API call: sending %d messages",
             len(messages),
         )
-        # Cache the system prompt (5-min TTL, ~90% cost reduction)
-        system = [
-            {
-                "type": "text",
-                "text": SYSTEM_PROMPT,
-                "cache_control": {"type": "ephemeral"},
-            }
-        ]
         if tools is None:
             tools = _get_filtered_tools({"core"})
         selected_model = model or self.settings.claude_model
         kwargs: dict = {
             "model": selected_model,
             "max_tokens": self.settings.claude_max_tokens,
-            "system": system,
-            "messages": messages,
+            "system": _SYSTEM_BLOCKS,
+            "messages": _with_cache_breakpoints(messages, history_len),
             "tools": tools,
         }
         thinking_budget = self.settings.claude_thinking_budget
@@ -401,9 +560,14 @@ class Agent:
         if thinking_budget >= 1024 and selected_model == self.settings.claude_model:
             kwargs["thinking"] = {"type": "enabled", "budget_tokens": thinking_budget}
 
+        api_error = self._anthropic.APIError
         try:
-            response = self.client.messages.create(**kwargs)
-        except anthropic.APIError as e:
+            if _requires_streaming(selected_model, kwargs["max_tokens"]):
+                with self.client.messages.stream(**kwargs) as stream:
+                    response = stream.get_final_message()
+            else:
+                response = self.client.messages.create(**kwargs)
+        except api_error as e:
             status = getattr(e, "status_code", None)
             logger.error(
                 "Claude API error: %s (status=%s) — %s",
@@ -442,25 +606,36 @@ class Agent:
         )
 
         if image_paths:
-            content = []
-            for path in image_paths:
-                data, media_type = encode_image_base64(path)
-                content.append(
-                    {
-                        "type": "image",
-                        "source": {"type": "base64", "media_type": media_type, "data": data},
-                    }
-                )
+            # Encode in parallel when several photos arrive at once (disk I/O +
+            # JPEG re-encode per image). map() preserves input order.
+            if len(image_paths) >= 2:
+                with ThreadPoolExecutor(max_workers=min(len(image_paths), 4)) as pool:
+                    encoded = list(pool.map(encode_image_base64, image_paths))
+            else:
+                encoded = [encode_image_base64(image_paths[0])]
+            content = [
+                {
+                    "type": "image",
+                    "source": {"type": "base64", "media_type": media_type, "data": data},
+                }
+                for data, media_type in encoded
+            ]
             text = user_message or (
                 "Användaren skickade dessa bilder. "
                 "Beskriv vad du ser och fråga hur du kan hjälpa till."
             )
-            paths_info = ", ".join(image_paths)
-            text += f"\n\n[Bildernas sökvägar: {paths_info}]"
-            content.append({"type": "text", "text": text})
-            messages = conversation_history + [{"role": "user", "content": content}]
+            content.append(
+                {
+                    "type": "text",
+                    "text": f"{text}\n\n[Bildernas sökvägar: {', '.join(image_paths)}]",
+                }
+            )
         else:
-            messages = conversation_history + [{"role": "user", "content": user_message}]
+            content = user_message
+        # Grown in place for the whole tool loop; never rebuilt per hop.
+        history_len = len(conversation_history)
+        messages = list(conversation_history)
+        messages.append({"role": "user", "content": content})
 
         # Token accumulation across all API calls in this turn
         total_input = 0
@@ -503,7 +678,9 @@ class Agent:
                     )
                 logger.debug("Thinking (%d chars): %.200s...", len(thinking_text), thinking_text)
 
-        response = self._call_api(messages, tools=filtered_tools, model=selected_model)
+        response = self._call_api(
+            messages, tools=filtered_tools, model=selected_model, history_len=history_len
+        )
         _accumulate_usage(response)
         _log_thinking(response)
         all_display_images = []
@@ -547,39 +724,16 @@ class Agent:
                 )
                 result_by_id[rb.id] = result
 
-            # Process regular tool blocks (parallel if 2+)
-            if len(regular_blocks) >= 2:
-                with ThreadPoolExecutor(max_workers=min(len(regular_blocks), 4)) as pool:
-                    futures = {
-                        pool.submit(self.execute_tool, b.name, b.input): i
-                        for i, b in enumerate(regular_blocks)
-                    }
-                    results_by_index = {}
-                    for future in futures:
-                        idx = futures[future]
-                        try:
-                            results_by_index[idx] = future.result()
-                        except Exception as exc:
-                            logger.exception("Tool failed in parallel execution")
-                            results_by_index[idx] = {"error": str(exc)}
-                for i, tool_block in enumerate(regular_blocks):
-                    result = results_by_index[i]
-                    display_images = result.pop("_display_images", None)
-                    if display_images:
-                        all_display_images.extend(display_images)
-                    result_by_id[tool_block.id] = result
-            else:
-                for tool_block in regular_blocks:
-                    result = self.execute_tool(tool_block.name, tool_block.input)
-                    display_images = result.pop("_display_images", None)
-                    if display_images:
-                        all_display_images.extend(display_images)
-                    result_by_id[tool_block.id] = result
+            for tool_block, result in zip(regular_blocks, self._run_tool_blocks(regular_blocks)):
+                display_images = result.pop("_display_images", None)
+                if display_images:
+                    all_display_images.extend(display_images)
+                result_by_id[tool_block.id] = result
 
             tool_results = []
             for b in tool_blocks:
                 result = result_by_id[b.id]
-                result_json = json.dumps(result, ensure_ascii=False, default=_json_default)
+                result_json = _encode_tool_result(result)
                 if (
                     b.name in REFLECTION_TOOLS
                     and isinstance(result, dict)
@@ -598,7 +752,9 @@ class Agent:
             logger.info("Agent turn completed: %d tool calls", len(tool_blocks))
             messages.append({"role": "user", "content": tool_results})
 
-            response = self._call_api(messages, tools=filtered_tools, model=selected_model)
+            response = self._call_api(
+                messages, tools=filtered_tools, model=selected_model, history_len=history_len
+            )
             _accumulate_usage(response)
             _log_thinking(response, reflection_tools=reflection_used or None)
 
@@ -618,6 +774,34 @@ class Agent:
         text = text_blocks[0].text if text_blocks else ""
         return AgentResponse(text=text, messages=messages, display_images=all_display_images)
 
+    def _execute_tool_safely(self, name: str, tool_input: dict) -> dict:
+        """Run one tool, turning an escaped exception into an error result.
+
+        Claude requires a tool_result for every tool_use id, so one failing
+        tool must not abort the rest of the turn. Tools in ``SERIAL_TOOLS``
+        hold a lock while running.
+        """
+        try:
+            if name in SERIAL_TOOLS:
+                with self._serial_tool_lock:
+                    return self.execute_tool(name, tool_input)
+            return self.execute_tool(name, tool_input)
+        except Exception as exc:
+            logger.exception("Tool failed: %s", name, extra={"tool_name": name})
+            return {"error": str(exc)}
+
+    def _run_tool_blocks(self, blocks: list) -> list[dict]:
+        """Execute tool_use blocks, in parallel threads when there are 2+.
+
+        Results are returned in block order. When several side-effecting tools
+        are requested together they all run serially, in block order.
+        """
+        if len(blocks) < 2 or sum(b.name in SERIAL_TOOLS for b in blocks) > 1:
+            return [self._execute_tool_safely(b.name, b.input) for b in blocks]
+        return list(
+            self._tool_pool.map(lambda b: self._execute_tool_safely(b.name, b.input), blocks)
+        )
+
     def _store_usage(
         self,
         chat_id: str | None,
@@ -699,7 +883,7 @@ class Agent:
             response = self.client.messages.create(
                 model=self.settings.claude_model_compact,
                 max_tokens=1024,
-                system=[{"type": "text", "text": _COMPACT_SYSTEM_PROMPT}],
+                system=_COMPACT_SYSTEM_BLOCKS,
                 messages=[
                     {
                         "role": "user",
@@ -783,6 +967,9 @@ class Agent:
             },
         )
 
+    def _get_categories_tool(self, **params) -> dict:
+        return self._execute_get_categories(params)
+
     def _execute_get_categories(self, params: dict) -> dict:
         """Query tradera_categories from DB, falling back to live API + sync."""
         query = params.get("query")
@@ -834,8 +1021,30 @@ class Agent:
         only make HTTP calls (tradera, blocket, postnord) are also safe since
         each request uses its own connection.
         """
-        if name == "get_categories":
-            if not isinstance(tool_input, dict):
-                return {"error": f"Invalid tool input type for '{name}': expected dict"}
-            return self._execute_get_categories(_strip_nulls(tool_input) or {})
-        return _dispatch_execute_tool(self._services, name, tool_input)
+        ttl = CACHEABLE_TOOL_TTL.get(name)
+        if ttl is None or not isinstance(tool_input, dict):
+            return _dispatch_execute_tool(self._handlers, name, tool_input)
+        return self._execute_cached_tool(name, tool_input, ttl)
+
+    def _execute_cached_tool(self, name: str, tool_input: dict, ttl: int) -> dict:
+        """Execute a read-only tool, reusing a result younger than ``ttl`` seconds.
+
+        The cache holds its own deep copy and hands out fresh copies, so a
+        caller mutating its result cannot change what later callers see.
+        """
+        key = (name, _encode_cache_key(tool_input))
+        now = time.monotonic()
+        with self._tool_cache_lock:
+            cached = self._tool_cache.get(key)
+        if cached and now - cached[0] < ttl:
+            logger.debug("Tool cache hit: %s", name)
+            return copy.deepcopy(cached[1])
+
+        result = _dispatch_execute_tool(self._handlers, name, tool_input)
+        if "error" not in result:
+            with self._tool_cache_lock:
+                self._tool_cache.pop(key, None)
+                self._tool_cache[key] = (now, copy.deepcopy(result))
+                if len(self._tool_cache) > _TOOL_CACHE_MAX_ENTRIES:
+                    del self._tool_cache[next(iter(self._tool_cache))]
+        return result
@@ -7,19 +7,24 @@ TELEGRAM_MAX_MESSAGE_LENGTH = 4000
 
 _FENCED_CODE_RE = re.compile(r"```(?:\w*)\n?(.*?)```", re.DOTALL)
 _INLINE_CODE_RE = re.compile(r"`([^`\n]+)`")
+_INLINE_PLACEHOLDER_RE = re.compile(r"\x00INLINE(\d+)\x00")
 _BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
 _ITALIC_STAR_RE = re.compile(r"(?<!\*)\*(?!\s)(.+?)(?<!\s)\*(?!\*)")
 _ITALIC_UNDER_RE = re.compile(r"(?<!\w)_(.+?)_(?!\w)")
 _STRIKE_RE = re.compile(r"~~(.+?)~~")
 # Allows one level of balanced parentheses in URLs (e.g. Wikipedia links)
 _LINK_RE = re.compile(r"\[([^\]]+)\]\(([^()\s]*(?:\([^()]*\)[^()\s]*)*)\)")
-_HEADER_RE = re.compile(r"^#{1,6}\s+(.+)$", re.MULTILINE)
+# Header and blockquote patterns are matched against single lines
+_HEADER_RE = re.compile(r"#{1,6}\s+(.+)")
 # Applied after html_escape(), so > has already become &gt; at this point
-_BLOCKQUOTE_RE = re.compile(r"^&gt;\s?(.+)$", re.MULTILINE)
-_OPEN_TAG_RE = re.compile(r"<(b|i|s|code|pre|blockquote|a)(?:\s[^>]*)?>")
-_CLOSE_TAG_RE = re.compile(r"</(b|i|s|code|pre|blockquote|a)>")
-_TAG_NAME_RE = re.compile(r"<(\w+)")
+_BLOCKQUOTE_RE = re.compile(r"&gt;\s?(.+)")
+# Opening and closing tags in one alternation, so they are seen in source order
+_TAG_RE = re.compile(r"<(/?)(b|i|s|code|pre|blockquote|a)(?:\s[^>]*)?>")
+# Closing tag per supported tag name, so boundaries need no string building
+_CLOSING_TAGS = {name: f"</{name}>" for name in ("b", "i", "s", "code", "pre", "blockquote", "a")}
 _TAG_STRIP_RE = re.compile(r"<[^>]+>")
+# Characters that can start Markdown syntax or need HTML escaping
+_MARKUP_CHARS = frozenset("*_`~[#>&<")
 
 
 def strip_html_tags(text: str) -> str:
@@ -32,21 +37,24 @@ def html_escape(text: str) -> str:
     return html.escape(text, quote=False)
 
 
-def markdown_to_telegram_html(text: str) -> str:
-    """Convert Claude's Markdown subset to Telegram-supported HTML tags.
+def _link_sub(m: re.Match) -> str:
+    url = m.group(2).replace('"', "&quot;")
+    if not url.startswith(("http://", "https://")):
+        return m.group(1)
+    return f'<a href="{url}">{m.group(1)}</a>'
 
-    Code blocks are extracted first to avoid processing Markdown inside them,
-    then reinserted at the end.
-    """
-    # Extract fenced code blocks before escaping
-    code_blocks: list[str] = []
 
-    def _stash_fenced(m: re.Match) -> str:
-        code_blocks.append(html_escape(m.group(1).strip()))
-        return f"\x00CODEBLOCK{len(code_blocks) - 1}\x00"
+def _format_line(line: str) -> str:
+    """Render a header or blockquote line; any other line is returned as is."""
+    if line.startswith("#") and (m := _HEADER_RE.fullmatch(line)):
+        return f"<b>{m.group(1)}</b>"
+    if line.startswith("&gt;") and (m := _BLOCKQUOTE_RE.fullmatch(line)):
+        return f"<blockquote>{m.group(1)}</blockquote>"
+    return line
 
-    text = _FENCED_CODE_RE.sub(_stash_fenced, text)
 
+def _format_prose(text: str) -> str:
+    """Convert Markdown outside fenced code blocks to Telegram HTML."""
     # Extract inline code before escaping
     inline_codes: list[str] = []
 
@@ -56,57 +64,78 @@ def markdown_to_telegram_html(text: str) -> str:
 
     text = _INLINE_CODE_RE.sub(_stash_inline, text)
 
-    # Escape remaining text, then apply formatting
+    # Escape remaining text, then apply formatting. Each pass rescans the whole
+    # reply, so passes whose marker cannot occur in the text are skipped.
     text = html_escape(text)
-    text = _BOLD_RE.sub(r"<b>\1</b>", text)
-    text = _ITALIC_STAR_RE.sub(r"<i>\1</i>", text)
-    text = _ITALIC_UNDER_RE.sub(r"<i>\1</i>", text)
-    text = _STRIKE_RE.sub(r"<s>\1</s>", text)
-
-    def _link_sub(m: re.Match) -> str:
-        url = m.group(2).replace('"', "&quot;")
-        if not url.startswith(("http://", "https://")):
-            return m.group(1)
-        return f'<a href="{url}">{m.group(1)}</a>'
-
-    text = _LINK_RE.sub(_link_sub, text)
-    text = _HEADER_RE.sub(r"<b>\1</b>", text)
-    text = _BLOCKQUOTE_RE.sub(r"<blockquote>\1</blockquote>", text)
-
-    # Reinsert code blocks
-    for i, block in enumerate(code_blocks):
-        text = text.replace(f"\x00CODEBLOCK{i}\x00", f"<pre>{block}</pre>")
-    for i, code in enumerate(inline_codes):
-        text = text.replace(f"\x00INLINE{i}\x00", f"<code>{code}</code>")
-
+    if "*" in text:
+        text = _BOLD_RE.sub(r"<b>\1</b>", text)
+        text = _ITALIC_STAR_RE.sub(r"<i>\1</i>", text)
+    if "_" in text:
+        text = _ITALIC_UNDER_RE.sub(r"<i>\1</i>", text)
+    if "~~" in text:
+        text = _STRIKE_RE.sub(r"<s>\1</s>", text)
+    if "](" in text:
+        text = _LINK_RE.sub(_link_sub, text)
+    if "#" in text or "&gt;" in text:
+        text = "\n".join(map(_format_line, text.split("\n")))
+
+    if inline_codes:
+        text = _INLINE_PLACEHOLDER_RE.sub(
+            lambda m: f"<code>{inline_codes[int(m.group(1))]}</code>", text
+        )
     return text
 
 
+def markdown_to_telegram_html(text: str) -> str:
+    """Convert Claude's Markdown subset to Telegram-supported HTML tags.
+
+    The text is split on fenced code blocks; prose segments are formatted on
+    their own and code is escaped verbatim, then the pieces are joined once.
+    """
+    if _MARKUP_CHARS.isdisjoint(text):
+        return text
+    # split() with one group alternates prose, code, prose, ..., prose
+    parts = _FENCED_CODE_RE.split(text)
+    out: list[str] = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(f"<pre>{html_escape(part.strip())}</pre>")
+        elif part:
+            out.append(_format_prose(part))
+    return "".join(out)
+
+
 def _get_open_tags(text: str) -> list[str]:
     """Return a stack of currently open HTML tags at the end of text.
 
     Preserves full opening tags (e.g. ``<a href="...">``) so they can be reopened.
     """
     stack: list[str] = []
-    for m in _OPEN_TAG_RE.finditer(text):
-        stack.append(m.group(0))
-    for m in _CLOSE_TAG_RE.finditer(text):
-        tag_name = m.group(1)
-        for j in range(len(stack) - 1, -1, -1):
-            if stack[j] == f"<{tag_name}>" or stack[j].startswith(f"<{tag_name} "):
-                stack.pop(j)
+    names: list[str] = []
+    for m in _TAG_RE.finditer(text):
+        if not m.group(1):
+            stack.append(m.group(0))
+            names.append(m.group(2))
+            continue
+        tag_name = m.group(2)
+        for j in range(len(names) - 1, -1, -1):
+            if names[j] == tag_name:
+                del stack[j], names[j]
                 break
     return stack
 
 
 def _close_tags(tags: list[str]) -> str:
-    """Generate closing tags in reverse order for a list of open tags."""
-    parts = []
-    for tag in reversed(tags):
-        m = _TAG_NAME_RE.match(tag)
-        if m:
-            parts.append(f"</{m.group(1)}>")
-    return "".join(parts)
+    """Generate closing tags in reverse order for a list of open tags.
+
+    ``tags`` come from ``_get_open_tags``, so each matches ``_TAG_RE``.
+    """
+    return "".join(_CLOSING_TAGS[_TAG_RE.match(tag).group(2)] for tag in reversed(tags))
+
+
+def _header_len(total: int) -> int:
+    """Length of the ``(i/total)\n`` header, sized for the widest index."""
+    return 2 * len(str(total)) + 4  # "(", "/", ")" and "\n"
 
 
 def split_html_message(text: str, max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH) -> list[str]:
@@ -122,42 +151,55 @@ def split_html_message(text: str, max_length: int = TELEGRAM_MAX_MESSAGE_LENGTH)
         return [text]
 
     estimated_parts = len(text) // max_length + 1
-    header_len = len(f"({estimated_parts}/{estimated_parts})\n")
+    header_len = _header_len(estimated_parts)
 
     # Max closing-tag overhead: </b></i></s></code></pre></blockquote></a> = 43 chars
     tag_reserve = 50
 
     def _do_split(chunk_size: int) -> list[str]:
+        # The unsplit remainder is ``reopen + text[pos:]``. It is tracked by
+        # offset rather than re-sliced per chunk, so long replies are copied
+        # once instead of once per chunk.
         chunks: list[str] = []
-        rest = text
+        pos = 0
+        reopen = ""  # tags closed at the previous boundary, reopened here
         # Leave room for closing tags that may be appended at boundaries
         split_limit = max(1, chunk_size - tag_reserve)
-        while rest:
-            if len(rest) <= chunk_size:
-                chunks.append(rest)
+        while reopen or pos < len(text):
+            if len(reopen) + len(text) - pos <= chunk_size:
+                chunks.append(reopen + text[pos:])
                 break
 
-            split_at = rest.rfind("\n\n", 0, split_limit)
+            # Only the first split_limit chars can hold the split point
+            window = reopen + text[pos : pos + split_limit]
+            split_at = window.rfind("\n\n", 0, split_limit)
             if split_at < split_limit // 2:
-                split_at = rest.rfind("\n", 0, split_limit)
+                split_at = window.rfind("\n", 0, split_limit)
             if split_at < split_limit // 2:
-                split_at = rest.rfind(" ", 0, split_limit)
+                split_at = window.rfind(" ", 0, split_limit)
             if split_at < split_limit // 2:
                 split_at = split_limit
 
-            chunk = rest[:split_at]
-            rest = rest[split_at:].lstrip("\n")
+            chunk = window[:split_at]
+            if split_at >= len(reopen):
+                pos += split_at - len(reopen)
+                reopen = ""
+            else:
+                reopen = reopen[split_at:].lstrip("\n")
+            if not reopen:
+                while pos < len(text) and text[pos] == "\n":
+                    pos += 1
 
             open_tags = _get_open_tags(chunk)
             if open_tags:
                 chunk += _close_tags(open_tags)
-                rest = "".join(open_tags) + rest
+                reopen = "".join(open_tags) + reopen
 
             chunks.append(chunk)
         return chunks
 
     chunks = _do_split(max_length - header_len)
-    actual_header_len = len(f"({len(chunks)}/{len(chunks)})\n")
+    actual_header_len = _header_len(len(chunks))
     if actual_header_len > header_len:
         chunks = _do_split(max_length - actual_header_len)
 
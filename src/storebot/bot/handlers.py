@@ -1,6 +1,9 @@
+import asyncio
+import contextlib
 import logging
 import time
-from collections import defaultdict
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import time as dt_time
 from pathlib import Path
 
@@ -25,12 +28,39 @@ from storebot.tools.image import resize_for_analysis
 
 logger = logging.getLogger(__name__)
 
-_rate_limit_buckets: dict[int, list[float]] = defaultdict(list)
+# chat_id -> (tokens left, monotonic time of last update), least recently
+# seen first. Capped so chats that stop writing don't accumulate forever; an
+# evicted chat has long since refilled, so dropping it changes nothing.
+_rate_limit_buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+_RATE_LIMIT_MAX_CHATS = 10_000
+# Updates are handled concurrently; turns within one chat must still run in
+# order so each sees the history the previous one saved. A chat's lock lives
+# only while some turn holds or waits for it, counted in _chat_lock_users.
+_chat_locks: dict[str, asyncio.Lock] = {}
+_chat_lock_users: Counter[str] = Counter()
+
+# APScheduler options for every scheduled job: a run still in progress
+# suppresses the next tick (max_instances), ticks missed while the loop was
+# busy collapse into one run (coalesce), and a slightly late tick still runs.
+_JOB_KWARGS = {"coalesce": True, "max_instances": 1, "misfire_grace_time": 60}
+# Size of the pool behind every asyncio.to_thread call: agent turns, reports
+# and scheduled jobs all share it.
+_WORKER_THREADS = 8
+
+
+async def _use_worker_pool(app: Application) -> None:
+    """Give the event loop a bounded, named default executor for to_thread work."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=_WORKER_THREADS, thread_name_prefix="storebot-worker")
+    )
+
 
+def _parse_allowed_chat_ids(raw: str) -> frozenset[int]:
+    """Parse comma-separated chat IDs into a set. Empty string = empty set (dev mode: all allowed).
 
-def _parse_allowed_chat_ids(raw: str) -> set[int]:
-    """Parse comma-separated chat IDs into a set. Empty string = empty set (dev mode: all allowed)."""
-    return {int(x) for x in raw.split(",") if x.strip()}
+    Frozen: the allow-list is fixed for the life of the process.
+    """
+    return frozenset(int(x) for x in raw.split(",") if x.strip())
 
 
 def _init_owner(bot_data: dict) -> None:
@@ -41,7 +71,7 @@ def _init_owner(bot_data: dict) -> None:
     Multi-user / dev mode: owner_chat_id is deferred to first authorized
     interaction via _check_access().
     """
-    allowed: set[int] = bot_data["allowed_chat_ids"]
+    allowed: frozenset[int] = bot_data["allowed_chat_ids"]
     if len(allowed) == 1:
         owner_id = next(iter(allowed))
         bot_data["owner_chat_id"] = owner_id
@@ -53,16 +83,41 @@ def _init_owner(bot_data: dict) -> None:
 
 
 def _is_rate_limited(chat_id: int, settings: Settings) -> bool:
-    """Return True if chat_id has exceeded the message rate limit."""
+    """Return True if chat_id has exceeded the message rate limit.
+
+    Token bucket: a chat holds up to ``rate_limit_messages`` tokens, refilled
+    evenly over ``rate_limit_window_seconds``, and each message spends one.
+    """
     now = time.monotonic()
+    capacity = settings.rate_limit_messages
     window = settings.rate_limit_window_seconds
-    bucket = [t for t in _rate_limit_buckets[chat_id] if now - t < window]
-    _rate_limit_buckets[chat_id] = bucket
-
-    if len(bucket) >= settings.rate_limit_messages:
-        return True
-    bucket.append(now)
-    return False
+    tokens, last = _rate_limit_buckets.get(chat_id, (capacity, now))
+    refill = (now - last) * capacity / window if window > 0 else capacity
+    tokens = min(capacity, tokens + refill)
+
+    limited = tokens < 1
+    _rate_limit_buckets[chat_id] = (tokens if limited else tokens - 1, now)
+    _rate_limit_buckets.move_to_end(chat_id)
+    if len(_rate_limit_buckets) > _RATE_LIMIT_MAX_CHATS:
+        _rate_limit_buckets.popitem(last=False)
+    return limited
+
+
+@contextlib.asynccontextmanager
+async def _chat_turn(chat_id: str):
+    """Hold chat_id's turn lock, dropping it once no other turn needs it."""
+    lock = _chat_locks.get(chat_id)
+    if lock is None:
+        lock = _chat_locks[chat_id] = asyncio.Lock()
+    _chat_lock_users[chat_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _chat_lock_users[chat_id] -= 1
+        if not _chat_lock_users[chat_id]:
+            del _chat_lock_users[chat_id]
+            del _chat_locks[chat_id]
 
 
 async def _reply(update: Update, text: str, parse_mode: str | None = ParseMode.HTML) -> None:
@@ -99,12 +154,16 @@ async def _send(
 async def _send_display_images(update: Update, display_images: list[dict]) -> None:
     """Send product images to the user via Telegram."""
     for img in display_images:
+        path = Path(img["path"])
         try:
-            with open(img["path"], "rb") as f:
-                await update.message.reply_photo(photo=f, caption=img.get("caption", ""))
+            # PTB reads file objects synchronously; do the disk read in a thread
+            data = await asyncio.to_thread(path.read_bytes)
+            await update.message.reply_photo(
+                photo=data, caption=img.get("caption", ""), filename=path.name
+            )
         except FileNotFoundError:
             logger.warning("Display image not found: %s", img["path"])
-            await update.message.reply_text(f"Bildfilen saknas: {Path(img['path']).name}")
+            await update.message.reply_text(f"Bildfilen saknas: {path.name}")
 
 
 _TREND_LABELS = {
@@ -178,25 +237,29 @@ async def _handle_with_conversation(
     chat_id = str(update.effective_chat.id)
 
     try:
-        history = conversation.load_history(chat_id)
-
-        if len(history) > agent.settings.compact_threshold:
-            compacted = agent.compact_history(history)
-            if compacted is not history:  # compaction succeeded (new list)
-                conversation.replace_history(chat_id, compacted)
-                history = compacted
-
-        result = agent.handle_message(
-            user_message,
-            image_paths=image_paths,
-            conversation_history=history,
-            chat_id=chat_id,
-        )
-        new_messages = result.messages[len(history) :]
-        conversation.save_messages(chat_id, new_messages)
-        if result.display_images:
-            await _send_display_images(update, result.display_images)
-        await _reply(update, markdown_to_telegram_html(result.text))
+        async with _chat_turn(chat_id):
+            history = conversation.load_history(chat_id)
+
+            if len(history) > agent.settings.compact_threshold:
+                compacted = await asyncio.to_thread(agent.compact_history, history)
+                if compacted is not history:  # compaction succeeded (new list)
+                    conversation.replace_history(chat_id, compacted)
+                    history = compacted
+
+            # The agent blocks on Claude and tool HTTP calls; run it off the event
+            # loop so other chats keep being served meanwhile.
+            result = await asyncio.to_thread(
+                agent.handle_message,
+                user_message,
+                image_paths=image_paths,
+                conversation_history=history,
+                chat_id=chat_id,
+            )
+            new_messages = result.messages[len(history) :]
+            conversation.save_messages(chat_id, new_messages)
+            if result.display_images:
+                await _send_display_images(update, result.display_images)
+            await _reply(update, markdown_to_telegram_html(result.text))
     except Exception as exc:
         logger.exception(
             "Error in conversation handler: %s: %s",
@@ -287,7 +350,9 @@ async def new_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         return
     conversation: ConversationService = context.bot_data["conversation"]
     chat_id = str(update.effective_chat.id)
-    conversation.clear_history(chat_id)
+    # Wait out a turn in flight, or its save would write the old history back
+    async with _chat_turn(chat_id):
+        conversation.clear_history(chat_id)
     await update.message.reply_text(
         f"Konversationen är nollställd. Vad kan jag hjälpa dig med?\n\nStorebot v{__version__}"
     )
@@ -299,7 +364,8 @@ async def orders_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     agent: Agent = context.bot_data["agent"]
     chat_id = str(update.effective_chat.id)
     try:
-        result = agent.handle_message(
+        result = await asyncio.to_thread(
+            agent.handle_message,
             "Kolla efter nya ordrar och visa en sammanfattning av alla väntande ordrar.",
             chat_id=chat_id,
         )
@@ -316,18 +382,27 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     file = await photo.get_file()
 
     settings: Settings = context.bot_data["settings"]
+    error_text = "Något gick fel vid bildanalysen. Försök igen."
+    # Created per photo so the directory may be moved or cleaned while running
     photos_dir = Path(settings.product_image_dir)
-    photos_dir.mkdir(parents=True, exist_ok=True)
-
     file_path = photos_dir / f"{file.file_unique_id}.jpg"
-    await file.download_to_drive(str(file_path))
-    logger.info(
-        "Downloaded photo: %s",
-        file_path,
-        extra={"chat_id": str(update.effective_chat.id)},
-    )
+    try:
+        photos_dir.mkdir(parents=True, exist_ok=True)
+        await file.download_to_drive(str(file_path))
+        logger.info(
+            "Downloaded photo: %s",
+            file_path,
+            extra={"chat_id": str(update.effective_chat.id)},
+        )
 
-    analysis_path = resize_for_analysis(str(file_path))
+        # PIL decode and resize are CPU-bound; keep them off the event loop
+        analysis_path = await asyncio.to_thread(resize_for_analysis, str(file_path))
+    except Exception:
+        logger.exception(
+            "Error preparing photo for analysis", extra={"chat_id": str(update.effective_chat.id)}
+        )
+        await update.message.reply_text(error_text)
+        return
     caption = update.message.caption or ""
 
     await _handle_with_conversation(
@@ -335,7 +410,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         context,
         caption,
         image_paths=[analysis_path],
-        error_text="Något gick fel vid bildanalysen. Försök igen.",
+        error_text=error_text,
     )
 
 
@@ -356,8 +431,10 @@ async def scout_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         await update.message.reply_text("Scout-tjänsten är inte tillgänglig.")
         return
 
+    # Saved searches run one after another and can take a while
+    await update.message.reply_text("Kör sparade sökningar…")
     try:
-        result = agent.scout.run_all_searches()
+        result = await asyncio.to_thread(agent.scout.run_all_searches)
         digest = result.get("digest", "Inga nya fynd.")
         await _reply(update, html_escape(digest))
     except Exception:
@@ -372,7 +449,8 @@ async def scout_digest_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        result = agent.scout.run_all_searches()
+        # Searches hit Tradera and Blocket; keep them off the event loop
+        result = await asyncio.to_thread(agent.scout.run_all_searches)
         if result.get("total_new", 0) == 0:
             return
 
@@ -397,9 +475,12 @@ async def rapport_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
 
     try:
-        summary = agent.analytics.business_summary()
-        profitability = agent.analytics.profitability_report()
-        inventory = agent.analytics.inventory_report()
+        # Independent read-only queries, each in its own session
+        summary, profitability, inventory = await asyncio.gather(
+            asyncio.to_thread(agent.analytics.business_summary),
+            asyncio.to_thread(agent.analytics.profitability_report),
+            asyncio.to_thread(agent.analytics.inventory_report),
+        )
         text = agent.analytics._format_full_report(summary, profitability, inventory)
         await _reply(update, html_escape(text))
     except Exception:
@@ -416,7 +497,7 @@ async def weekly_comparison_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        result = agent.analytics.period_comparison()
+        result = await asyncio.to_thread(agent.analytics.period_comparison)
         text = agent.analytics._format_comparison(result)
 
         chat_id = context.bot_data.get("owner_chat_id")
@@ -439,7 +520,7 @@ async def marketing_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     try:
-        report = agent.marketing.get_performance_report()
+        report = await asyncio.to_thread(agent.marketing.get_performance_report)
         text = agent.marketing._format_report(report)
         await _reply(update, html_escape(text))
     except Exception:
@@ -458,9 +539,9 @@ async def marketing_refresh_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        agent.marketing.refresh_listing_stats()
+        await asyncio.to_thread(agent.marketing.refresh_listing_stats)
 
-        result = agent.marketing.get_recommendations()
+        result = await asyncio.to_thread(agent.marketing.get_recommendations)
         high_priority = [r for r in result.get("recommendations", []) if r["priority"] == "high"]
         if not high_priority:
             return
@@ -488,8 +569,8 @@ async def daily_listing_report_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        agent.marketing.refresh_listing_stats()
-        dashboard = agent.marketing.get_listing_dashboard()
+        await asyncio.to_thread(agent.marketing.refresh_listing_stats)
+        dashboard = await asyncio.to_thread(agent.marketing.get_listing_dashboard)
 
         if not dashboard.get("listings"):
             return
@@ -513,7 +594,7 @@ async def repricing_check_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        result = agent.repricing.generate_proposals(skip_refresh=True)
+        result = await asyncio.to_thread(agent.repricing.generate_proposals, skip_refresh=True)
         proposals = result.get("proposals", [])
         if not proposals:
             return
@@ -549,7 +630,7 @@ async def check_expired_listings_job(context: ContextTypes.DEFAULT_TYPE) -> None
         return
 
     try:
-        result = agent.listing.check_expired_listings()
+        result = await asyncio.to_thread(agent.listing.check_expired_listings)
         if result.get("expired_count", 0) == 0:
             return
 
@@ -583,7 +664,7 @@ async def poll_orders_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        result = agent.order.check_new_orders()
+        result = await asyncio.to_thread(agent.order.check_new_orders)
         new_orders = result.get("new_orders", [])
         if not new_orders:
             return
@@ -593,13 +674,14 @@ async def poll_orders_job(context: ContextTypes.DEFAULT_TYPE) -> None:
             logger.warning("No owner_chat_id set — cannot send order notifications")
             return
 
-        for order in new_orders:
-            msg = (
-                f"Ny order! #{order['order_id']}\n"
-                f"Produkt: #{order['product_id']}\n"
-                f"Belopp: {order.get('sale_price', 0)} kr"
-            )
-            await _send(context, chat_id, html_escape(msg))
+        # One message for the whole batch; _send splits it if it gets too long
+        msg = "\n\n".join(
+            f"Ny order! #{order['order_id']}\n"
+            f"Produkt: #{order['product_id']}\n"
+            f"Belopp: {order.get('sale_price', 0)} kr"
+            for order in new_orders
+        )
+        await _send(context, chat_id, html_escape(msg))
 
     except Exception:
         logger.exception("Error in order polling job", extra={"job_name": "poll_orders"})
@@ -621,8 +703,21 @@ def main() -> None:
         logger.warning(
             "ALLOWED_CHAT_IDS is empty — all Telegram users can access the bot (dev mode)"
         )
+    if settings.compact_threshold >= settings.max_history_messages:
+        logger.warning(
+            "COMPACT_THRESHOLD (%d) >= MAX_HISTORY_MESSAGES (%d) — history will never be "
+            "compacted and the oldest messages are dropped every turn instead",
+            settings.compact_threshold,
+            settings.max_history_messages,
+        )
 
-    app = Application.builder().token(settings.telegram_bot_token).build()
+    app = (
+        Application.builder()
+        .token(settings.telegram_bot_token)
+        .concurrent_updates(True)
+        .post_init(_use_worker_pool)
+        .build()
+    )
 
     app.bot_data["settings"] = settings
     app.bot_data["allowed_chat_ids"] = _parse_allowed_chat_ids(settings.allowed_chat_ids)
@@ -649,16 +744,19 @@ def main() -> None:
             poll_orders_job,
             interval=settings.order_poll_interval_minutes * 60,
             first=60,
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info(
             "Order polling scheduled every %d minutes",
             settings.order_poll_interval_minutes,
         )
 
+        # Start 30 s after order polling so the two first runs don't overlap
         app.job_queue.run_repeating(
             check_expired_listings_job,
             interval=settings.expired_listings_check_interval_minutes * 60,
-            first=60,
+            first=90,
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info(
             "Expired listings check scheduled every %d minutes",
@@ -668,6 +766,7 @@ def main() -> None:
         app.job_queue.run_daily(
             scout_digest_job,
             time=dt_time(hour=settings.scout_digest_hour),
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info(
             "Scout digest scheduled daily at %02d:00",
@@ -677,24 +776,29 @@ def main() -> None:
         app.job_queue.run_daily(
             marketing_refresh_job,
             time=dt_time(hour=settings.marketing_refresh_hour),
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info(
             "Marketing refresh scheduled daily at %02d:00",
             settings.marketing_refresh_hour,
         )
 
+        # Quarter past, so it doesn't refresh Tradera stats at the same moment
+        # as marketing_refresh_job when both use the same hour (the default).
         app.job_queue.run_daily(
             daily_listing_report_job,
-            time=dt_time(hour=settings.listing_report_hour),
+            time=dt_time(hour=settings.listing_report_hour, minute=15),
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info(
-            "Listing dashboard report scheduled daily at %02d:00",
+            "Listing dashboard report scheduled daily at %02d:15",
             settings.listing_report_hour,
         )
 
         app.job_queue.run_daily(
             repricing_check_job,
             time=dt_time(hour=settings.repricing_check_hour),
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info(
             "Repricing check scheduled daily at %02d:00",
@@ -705,6 +809,7 @@ def main() -> None:
             weekly_comparison_job,
             time=dt_time(hour=18),
             days=(6,),
+            job_kwargs=_JOB_KWARGS,
         )
         logger.info("Weekly business comparison scheduled Sundays at 18:00")
 
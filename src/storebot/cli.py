@@ -1,44 +1,65 @@
 """CLI commands for Storebot setup and administration."""
 
 import json
+import os
 import re
 import sys
+import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qs, urlsplit
 
 import anthropic
 
-from storebot.config import Settings
+from storebot.config import get_settings
 from storebot.db import init_db
 from storebot.tools.tradera import TraderaClient
 
+# Outermost [...] span, for LLM replies that wrap the array in prose
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
 
-def _update_env_file(env_path: Path, key: str, value: str) -> None:
-    """Append or update a key=value pair in a .env file."""
-    line = f"{key}={value}"
 
-    if not env_path.exists():
-        env_path.write_text(f"{line}\n")
-        env_path.chmod(0o600)
-        return
+def _update_env_file(env_path: Path, updates: dict[str, str]) -> None:
+    """Append or update key=value pairs in a .env file.
 
-    content = env_path.read_text()
-    pattern = re.compile(rf"^{re.escape(key)}=.*$", re.MULTILINE)
-
-    if pattern.search(content):
-        env_path.write_text(pattern.sub(lambda m: line, content))
-    else:
-        if not content.endswith("\n"):
+    All pairs are applied to one in-memory copy, written to a private (0600)
+    temp file beside it and renamed over the original, so an interrupted write
+    never leaves a truncated .env, or a readable copy of its secrets, behind.
+    """
+    content = env_path.read_text() if env_path.exists() else ""
+
+    # Split on "\n" only, so every other line comes back byte for byte
+    lines = content.split("\n")
+    missing = []
+    for key, value in updates.items():
+        prefix = f"{key}="
+        matches = [i for i, existing in enumerate(lines) if existing.startswith(prefix)]
+        for i in matches:
+            lines[i] = f"{key}={value}"
+        if not matches:
+            missing.append(f"{key}={value}\n")
+
+    content = "\n".join(lines)
+    if missing:
+        if content and not content.endswith("\n"):
             content += "\n"
-        env_path.write_text(content + f"{line}\n")
+        content += "".join(missing)
 
-    env_path.chmod(0o600)
+    # mkstemp creates the file 0600 under a unique name
+    fd, tmp_name = tempfile.mkstemp(dir=env_path.parent, prefix=f"{env_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(tmp_name, env_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
 
 
 def _parse_redirect_url(url: str) -> dict:
     """Parse userId, token and expiration from Tradera's redirect URL."""
-    params = parse_qs(urlparse(url.strip()).query)
+    params = parse_qs(urlsplit(url.strip()).query)
 
     result = {"user_id": params.get("userId", [None])[0]}
     token = params.get("token", [None])[0]
@@ -56,7 +77,7 @@ def authorize_tradera() -> None:
     Tries FetchToken (Option 2) first, falls back to the token from the
     redirect URL (Option 3) if FetchToken fails.
     """
-    settings = Settings()
+    settings = get_settings()
 
     if not settings.tradera_app_id:
         print("Error: TRADERA_APP_ID is not set in .env")
@@ -127,9 +148,11 @@ def authorize_tradera() -> None:
     answer = input("Save credentials to .env? [Y/n] ").strip().lower()
     if answer in ("", "y", "yes"):
         env_path = Path(".env")
-        _update_env_file(env_path, "TRADERA_USER_TOKEN", token)
+        updates = {"TRADERA_USER_TOKEN": token}
+        if user_id:
+            updates["TRADERA_USER_ID"] = user_id
+        _update_env_file(env_path, updates)
         if user_id:
-            _update_env_file(env_path, "TRADERA_USER_ID", user_id)
             print(f"Saved TRADERA_USER_TOKEN and TRADERA_USER_ID to {env_path}")
         else:
             print(f"Saved TRADERA_USER_TOKEN to {env_path}")
@@ -148,24 +171,47 @@ def _extract_json_array(text: str) -> str:
     if text.startswith("```"):
         text = text.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
     # If the model prefixed prose before the array, extract just the array
-    match = re.search(r"\[.*\]", text, re.DOTALL)
+    match = _JSON_ARRAY_RE.search(text)
     return match.group(0) if match else text
 
 
+def _request_descriptions(client, model: str, lines: list[str]) -> str:
+    """Ask Claude to describe one batch of categories; returns the response text."""
+    prompt = (
+        "For each Tradera category below, write a 1-sentence Swedish description "
+        "explaining what types of products belong there. "
+        'Return ONLY a JSON array: [{"tradera_id": ..., "description": "..."}]\n\n'
+        "Categories:\n" + "\n".join(lines)
+    )
+
+    response = client.messages.create(
+        model=model,
+        max_tokens=4096,
+        messages=[{"role": "user", "content": prompt}],
+    )
+
+    for block in response.content:
+        if getattr(block, "type", None) == "text":
+            return getattr(block, "text", "")
+    return ""
+
+
 def generate_category_descriptions(engine, api_key: str, model: str) -> int:
     """Generate Swedish descriptions for categories missing them.
 
     Batches categories in groups of 50 and calls Claude to generate
-    one-sentence descriptions. Returns the total count of descriptions
-    generated.
+    one-sentence descriptions, up to four batches at a time. Returns the
+    total count of descriptions generated.
     """
     from sqlalchemy.orm import Session
 
     from storebot.db import TraderaCategory
 
-    with Session(engine, expire_on_commit=False) as session:
+    with Session(engine) as session:
+        # Plain (id, tradera_id, path) rows rather than ORM entities: nothing
+        # but these columns is needed and no identity map is built up.
         missing = (
-            session.query(TraderaCategory)
+            session.query(TraderaCategory.id, TraderaCategory.tradera_id, TraderaCategory.path)
             .filter(TraderaCategory.description.is_(None))
             .order_by(TraderaCategory.depth, TraderaCategory.name)
             .all()
@@ -176,58 +222,59 @@ def generate_category_descriptions(engine, api_key: str, model: str) -> int:
         client = anthropic.Anthropic(api_key=api_key)
         total = 0
         batch_size = 50
-
-        for i in range(0, len(missing), batch_size):
-            batch = missing[i : i + batch_size]
-            lines = [f'- ID {cat.tradera_id}, Path: "{cat.path}"' for cat in batch]
-
-            prompt = (
-                "For each Tradera category below, write a 1-sentence Swedish description "
-                "explaining what types of products belong there. "
-                'Return ONLY a JSON array: [{"tradera_id": ..., "description": "..."}]\n\n'
-                "Categories:\n" + "\n".join(lines)
-            )
-
-            response = client.messages.create(
-                model=model,
-                max_tokens=4096,
-                messages=[{"role": "user", "content": prompt}],
-            )
-
-            text = ""
-            for block in response.content:
-                if getattr(block, "type", None) == "text":
-                    text = getattr(block, "text", "")
-                    break
-
-            text = _extract_json_array(text)
-
-            try:
-                descriptions = json.loads(text)
-            except json.JSONDecodeError:
-                print(f"  Warning: Failed to parse JSON for batch {i // batch_size + 1}, skipping")
-                continue
-
-            by_id = {
-                d["tradera_id"]: d["description"]
-                for d in descriptions
-                if isinstance(d, dict) and "tradera_id" in d and "description" in d
+        batches = [missing[i : i + batch_size] for i in range(0, len(missing), batch_size)]
+        batch_lines = [
+            [f'- ID {row.tradera_id}, Path: "{row.path}"' for row in batch] for batch in batches
+        ]
+
+        # The requests are independent and network-bound. Results are handled
+        # here as they arrive, so the session is only touched from this thread
+        # and each finished batch is committed before the next is awaited.
+        with ThreadPoolExecutor(max_workers=min(len(batches), 4)) as pool:
+            futures = {
+                pool.submit(_request_descriptions, client, model, lines): n
+                for n, lines in enumerate(batch_lines, start=1)
             }
-            for cat in batch:
-                desc = by_id.get(cat.tradera_id)
-                if desc:
-                    cat.description = desc
-                    total += 1
-
-            session.commit()
-            print(f"  Batch {i // batch_size + 1}: {len(by_id)} descriptions generated")
+            try:
+                for future in as_completed(futures):
+                    n = futures[future]
+                    batch = batches[n - 1]
+                    text = _extract_json_array(future.result())
+
+                    try:
+                        descriptions = json.loads(text)
+                    except json.JSONDecodeError:
+                        print(f"  Warning: Failed to parse JSON for batch {n}, skipping")
+                        continue
+
+                    by_id = {
+                        d["tradera_id"]: d["description"]
+                        for d in descriptions
+                        if isinstance(d, dict) and "tradera_id" in d and "description" in d
+                    }
+                    updates = [
+                        {"id": row.id, "description": desc}
+                        for row in batch
+                        if (desc := by_id.get(row.tradera_id))
+                    ]
+                    if updates:
+                        session.bulk_update_mappings(TraderaCategory, updates)
+                        total += len(updates)
+
+                    session.commit()
+                    print(f"  Batch {n}: {len(by_id)} descriptions generated")
+            except BaseException:
+                # Don't pay for requests that have not started yet; batches
+                # already handled stay committed.
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
 
     return total
 
 
 def sync_categories() -> None:
     """Sync Tradera category hierarchy and generate LLM descriptions."""
-    settings = Settings()
+    settings = get_settings()
 
     if not settings.tradera_app_id:
         print("Error: TRADERA_APP_ID is not set in .env")
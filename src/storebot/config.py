@@ -1,3 +1,5 @@
+import functools
+
 from pydantic_settings import BaseSettings
 
 
@@ -54,7 +56,10 @@ class Settings(BaseSettings):
 
     # Context compaction
     claude_model_compact: str = "claude-haiku-3-5-20241022"
-    compact_threshold: int = 20  # trigger compaction above this many messages
+    # Trigger compaction above this many messages. Keep it below
+    # max_history_messages: once the history window slides, the prompt prefix
+    # changes every turn and Claude's prompt cache stops hitting.
+    compact_threshold: int = 16
     compact_keep_recent: int = 6  # keep this many recent messages verbatim
 
     # Scout
@@ -62,7 +67,7 @@ class Settings(BaseSettings):
 
     # Marketing
     marketing_refresh_hour: int = 7  # Hour (0-23) for daily stats refresh
-    listing_report_hour: int = 7  # Hour (0-23) for daily listing dashboard report
+    listing_report_hour: int = 7  # Hour (0-23) for daily listing report, sent at :15
     repricing_check_hour: int = 9  # Hour (0-23) for daily repricing proposal check
 
     # Database
@@ -87,5 +92,10 @@ class Settings(BaseSettings):
     log_file: str = ""
 
 
+@functools.lru_cache(maxsize=1)
 def get_settings() -> Settings:
+    """Process-wide settings, read from the environment and .env once.
+
+    Call ``get_settings.cache_clear()`` to pick up changes to either.
+    """
     return Settings()
@@ -13,6 +13,10 @@ from pathlib import Path
 
 EXTRA_FIELDS = ("chat_id", "order_id", "listing_id", "tool_name", "job_name")
 
+# Libraries that log routine traffic at INFO. httpx logs every Telegram
+# long-poll request, with the bot token in the URL.
+QUIET_LOGGERS = ("httpx", "httpcore", "apscheduler")
+
 
 def _json_default(o: object) -> object:
     """JSON encoder fallback — converts Decimal (from zeep SOAP) to float."""
@@ -55,6 +59,11 @@ def configure_logging(level: str = "INFO", json_format: bool = True, log_file: s
     root = logging.getLogger()
     root.setLevel(getattr(logging, level.upper(), logging.INFO))
 
+    # Keep library chatter at WARNING unless debugging
+    quiet_level = logging.NOTSET if root.level <= logging.DEBUG else logging.WARNING
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(quiet_level)
+
     # Remove existing handlers to avoid duplicates
     root.handlers.clear()
 
@@ -19,13 +19,20 @@ from mcp.server.lowlevel import Server
 from storebot.config import Settings, get_settings
 from storebot.db import init_db
 from storebot.tools.definitions import TOOLS
-from storebot.tools.dispatch import create_services, execute_tool
+from storebot.tools.dispatch import bind_handlers, create_services, execute_tool
 
 logger = logging.getLogger(__name__)
 
 # Agent-internal tools not applicable to MCP clients.
 _MCP_EXCLUDED_TOOLS = {"request_tools"}
 
+# One reusable encoder for tool results; compact and UTF-8 rather than \u escapes.
+_encode_result = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(",", ":"),
+    default=str,
+).encode
+
 
 def _build_tools() -> list[types.Tool]:
     """Convert definitions.py TOOLS to MCP Tool objects."""
@@ -48,6 +55,7 @@ def _create_server(services: dict[str, object]) -> Server:
     """Create and configure the MCP server with tool handlers."""
     server = Server("storebot")
     tools = _build_tools()
+    handlers = bind_handlers(services)
 
     @server.list_tools()
     async def handle_list_tools() -> list[types.Tool]:
@@ -56,8 +64,8 @@ def _create_server(services: dict[str, object]) -> Server:
     @server.call_tool()
     async def handle_call_tool(name: str, arguments: dict | None) -> types.CallToolResult:
         loop = asyncio.get_running_loop()
-        result = await loop.run_in_executor(None, execute_tool, services, name, arguments or {})
-        text = json.dumps(result, default=str)
+        result = await loop.run_in_executor(None, execute_tool, handlers, name, arguments or {})
+        text = _encode_result(result)
         is_error = "error" in result
         return types.CallToolResult(
             content=[types.TextContent(type="text", text=text)],
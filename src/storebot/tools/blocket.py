@@ -1,6 +1,7 @@
 import json
 import logging
 import re
+import threading
 from enum import StrEnum
 
 import requests
@@ -229,13 +230,26 @@ class BlocketClient:
     No authentication required.
     """
 
+    def __init__(self) -> None:
+        # requests.Session is not documented as thread-safe, and searches run
+        # on several worker threads at once, so each thread gets its own.
+        self._sessions = threading.local()
+
     @staticmethod
     def _headers() -> dict:
         return {"User-Agent": USER_AGENT}
 
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's keep-alive session; repeat requests skip the TLS handshake."""
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = self._sessions.session = requests.Session()
+        return session
+
     @retry_on_transient()
     def _get(self, url: str, headers: dict, params: dict | None = None) -> requests.Response:
-        resp = requests.get(url, params=params, headers=headers, timeout=15)
+        resp = self.session.get(url, params=params, headers=headers, timeout=15)
         if resp.status_code >= 500:
             raise requests.HTTPError(response=resp)
         return resp
@@ -1,6 +1,9 @@
+import copy
 import logging
+from collections import OrderedDict, deque
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import NamedTuple
 
 import sqlalchemy as sa
 
@@ -156,18 +159,52 @@ def _trim_orphaned_tool_messages(messages: list[dict]) -> list[dict]:
     return []
 
 
+class _StoredMessage(NamedTuple):
+    """A persisted message as held in the in-memory history cache.
+
+    ``content`` is owned by the cache: rows are built from a copy of the
+    caller's blocks and ``load_history`` hands out copies, so neither side
+    can mutate the other's messages.
+    """
+
+    created_at: datetime
+    role: str
+    content: object
+    image_paths: list | None
+
+    @classmethod
+    def from_row(cls, row: ConversationMessage) -> "_StoredMessage":
+        created_at = row.created_at
+        # SQLite drops tzinfo on round-trip; stored values are always UTC.
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=UTC)
+        return cls(created_at, row.role, row.content, row.image_paths)
+
+
 class ConversationService:
+    """Per-chat conversation history persisted in SQLite.
+
+    Recently used chats are also kept in an in-memory LRU so that each turn
+    does not re-query and re-decode the whole history. All writes go through
+    this service, which keeps cached entries in sync with the database.
+    """
+
     def __init__(
         self,
         engine: sa.Engine,
         max_messages: int = 60,
         timeout_minutes: int = 60,
         max_content_bytes: int = 1_000_000,
+        cache_size: int = 64,
     ):
         self.engine = engine
         self.max_messages = max_messages
         self.timeout_minutes = timeout_minutes
         self.max_content_bytes = max_content_bytes
+        self.cache_size = cache_size
+        # Each chat's entries are a window bounded by max_messages, so
+        # appending a turn drops the oldest entries without copying the rest.
+        self._cache: OrderedDict[str, deque[_StoredMessage]] = OrderedDict()
 
     @staticmethod
     def _to_row(chat_id: str, msg: dict) -> ConversationMessage:
@@ -175,52 +212,78 @@ class ConversationService:
         return ConversationMessage(
             chat_id=str(chat_id),
             role=msg.get("role"),
-            content=_serialize_content(content),
+            content=copy.deepcopy(_serialize_content(content)),
             image_paths=_extract_image_paths(content),
+            created_at=datetime.now(UTC),
         )
 
-    def save_messages(self, chat_id: str, messages: list[dict]) -> None:
-        """Save a list of message dicts to the database."""
-        with sa.orm.Session(self.engine) as session:
-            for msg in messages:
-                session.add(self._to_row(chat_id, msg))
-            session.commit()
+    def _cache_put(self, chat_id: str, entries: list[_StoredMessage]) -> deque[_StoredMessage]:
+        window = self._cache[chat_id] = deque(entries, maxlen=self.max_messages)
+        self._cache.move_to_end(chat_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return window
 
-    def load_history(self, chat_id: str) -> list[dict]:
-        """Load recent conversation history for a chat, respecting timeout, max messages,
-        and max content size to prevent excessive API payloads."""
-        cutoff = datetime.now(UTC) - timedelta(minutes=self.timeout_minutes)
+    def _stored_messages(self, chat_id: str, cutoff: datetime) -> deque[_StoredMessage]:
+        """Return the cached entries for a chat, loading from the database on a miss."""
+        cached = self._cache.get(chat_id)
+        if cached is not None:
+            self._cache.move_to_end(chat_id)
+            return cached
 
         with sa.orm.Session(self.engine) as session:
             rows = (
                 session.query(ConversationMessage)
                 .filter(
-                    ConversationMessage.chat_id == str(chat_id),
+                    ConversationMessage.chat_id == chat_id,
                     ConversationMessage.created_at >= cutoff,
                 )
                 .order_by(ConversationMessage.created_at.asc(), ConversationMessage.id.asc())
                 .all()
             )
+            entries = [_StoredMessage.from_row(row) for row in rows[-self.max_messages :]]
+        return self._cache_put(chat_id, entries)
+
+    def save_messages(self, chat_id: str, messages: list[dict]) -> None:
+        """Save a list of message dicts to the database."""
+        rows = [self._to_row(chat_id, msg) for msg in messages]
+        with sa.orm.Session(self.engine, expire_on_commit=False) as session:
+            session.add_all(rows)
+            session.commit()
 
-            # Iterate newest-first so truncation drops oldest messages,
-            # keeping the most recent context for the agent.
-            messages = []
-            total_bytes = 0
-            for row in reversed(rows[-self.max_messages :]):
-                content = row.content
-                if row.image_paths:
-                    content = _reconstruct_image_blocks(content, row.image_paths)
-                size = len(str(content).encode("utf-8", errors="replace"))
-                if total_bytes + size > self.max_content_bytes and messages:
-                    logger.info(
-                        "Truncating conversation history at %d bytes (limit %d)",
-                        total_bytes,
-                        self.max_content_bytes,
-                    )
-                    break
-                total_bytes += size
-                messages.append({"role": row.role, "content": content})
-            messages.reverse()
+        chat_id = str(chat_id)
+        cached = self._cache.get(chat_id)
+        if cached is not None:
+            cached.extend(_StoredMessage.from_row(row) for row in rows)
+            self._cache.move_to_end(chat_id)
+
+    def load_history(self, chat_id: str) -> list[dict]:
+        """Load recent conversation history for a chat, respecting timeout, max messages,
+        and max content size to prevent excessive API payloads."""
+        cutoff = datetime.now(UTC) - timedelta(minutes=self.timeout_minutes)
+        entries = [
+            e for e in self._stored_messages(str(chat_id), cutoff) if e.created_at >= cutoff
+        ]
+
+        # Iterate newest-first so truncation drops oldest messages,
+        # keeping the most recent context for the agent.
+        messages = []
+        total_bytes = 0
+        for entry in reversed(entries[-self.max_messages :]):
+            content = copy.deepcopy(entry.content)
+            if entry.image_paths:
+                content = _reconstruct_image_blocks(content, entry.image_paths)
+            size = len(str(content).encode("utf-8", errors="replace"))
+            if total_bytes + size > self.max_content_bytes and messages:
+                logger.info(
+                    "Truncating conversation history at %d bytes (limit %d)",
+                    total_bytes,
+                    self.max_content_bytes,
+                )
+                break
+            total_bytes += size
+            messages.append({"role": entry.role, "content": content})
+        messages.reverse()
 
         return _trim_orphaned_tool_messages(messages)
 
@@ -237,6 +300,7 @@ class ConversationService:
             for msg in messages:
                 session.add(self._to_row(chat_id, msg))
             session.commit()
+        self._cache.pop(str(chat_id), None)
 
     def clear_history(self, chat_id: str) -> None:
         """Delete all conversation messages for a chat."""
@@ -245,3 +309,4 @@ class ConversationService:
                 ConversationMessage.chat_id == str(chat_id),
             ).delete()
             session.commit()
+        self._cache.pop(str(chat_id), None)
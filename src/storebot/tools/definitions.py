@@ -84,6 +84,12 @@ _PERIOD_SCHEMA = {
     "additionalProperties": False,
 }
 
+# Shared enum fragments; tools spread these and add their own description so
+# the allowed values cannot drift between create/update/revise variants.
+_LISTING_TYPE_SCHEMA = {"type": "string", "enum": ["auction", "buy_it_now"]}
+_DURATION_DAYS_SCHEMA = {"type": "integer", "enum": [3, 5, 7, 10, 14]}
+_SEARCH_PLATFORM_SCHEMA = {"type": "string", "enum": ["tradera", "blocket", "both"]}
+
 # Schema for tools that take no parameters.
 _EMPTY_SCHEMA = {
     "type": "object",
@@ -91,7 +97,9 @@ _EMPTY_SCHEMA = {
     "additionalProperties": False,
 }
 
-TOOLS = [
+# A tuple so no caller can add or drop tools at runtime; every consumer
+# (agent, dispatch, MCP server) derives its own views from it at import.
+TOOLS: tuple[dict, ...] = (
     # --- Tradera ---
     {
         "name": "search_tradera",
@@ -270,8 +278,7 @@ TOOLS = [
             "properties": {
                 "product_id": {"type": "integer", "description": "Local product ID"},
                 "listing_type": {
-                    "type": "string",
-                    "enum": ["auction", "buy_it_now"],
+                    **_LISTING_TYPE_SCHEMA,
                     "description": "Auction or fixed-price listing",
                 },
                 "listing_title": {"type": "string", "description": "Listing title in Swedish"},
@@ -292,8 +299,7 @@ TOOLS = [
                     "description": "Fixed price / buy-it-now price in SEK (omit to skip)",
                 },
                 "duration_days": {
-                    "type": "integer",
-                    "enum": [3, 5, 7, 10, 14],
+                    **_DURATION_DAYS_SCHEMA,
                     "description": "Listing duration in days (omit defaults to 7)",
                 },
                 "tradera_category_id": {
@@ -360,8 +366,7 @@ TOOLS = [
                     "description": "New description (omit to keep current)",
                 },
                 "listing_type": {
-                    "type": "string",
-                    "enum": ["auction", "buy_it_now"],
+                    **_LISTING_TYPE_SCHEMA,
                     "description": "New listing type (omit to keep current)",
                 },
                 "start_price": {
@@ -373,8 +378,7 @@ TOOLS = [
                     "description": "New buy-it-now price (omit to keep current)",
                 },
                 "duration_days": {
-                    "type": "integer",
-                    "enum": [3, 5, 7, 10, 14],
+                    **_DURATION_DAYS_SCHEMA,
                     "description": "New duration (omit to keep current)",
                 },
                 "tradera_category_id": {
@@ -475,8 +479,7 @@ TOOLS = [
                     "description": "Ny beskrivning (omit to keep original)",
                 },
                 "listing_type": {
-                    "type": "string",
-                    "enum": ["auction", "buy_it_now"],
+                    **_LISTING_TYPE_SCHEMA,
                     "description": "Ny annonstyp (omit to keep original)",
                 },
                 "start_price": {
@@ -488,8 +491,7 @@ TOOLS = [
                     "description": "Nytt köp nu-pris (omit to keep original)",
                 },
                 "duration_days": {
-                    "type": "integer",
-                    "enum": [3, 5, 7, 10, 14],
+                    **_DURATION_DAYS_SCHEMA,
                     "description": "Ny varaktighet i dagar (omit to keep original)",
                 },
                 "tradera_category_id": {
@@ -952,8 +954,7 @@ TOOLS = [
             "properties": {
                 "query": {"type": "string", "description": "Search query (e.g. 'antik byrå')"},
                 "platform": {
-                    "type": "string",
-                    "enum": ["tradera", "blocket", "both"],
+                    **_SEARCH_PLATFORM_SCHEMA,
                     "description": "Which platform(s) to search (omit defaults to both)",
                 },
                 "category": {
@@ -1001,8 +1002,7 @@ TOOLS = [
                     "description": "New search query (omit to keep current)",
                 },
                 "platform": {
-                    "type": "string",
-                    "enum": ["tradera", "blocket", "both"],
+                    **_SEARCH_PLATFORM_SCHEMA,
                     "description": "New platform filter (omit to keep current)",
                 },
                 "category": {
@@ -1292,7 +1292,7 @@ TOOLS = [
             "additionalProperties": False,
         },
     },
-]
+)
 
 # Lookup: category → list of tool names
 TOOL_CATEGORIES: dict[str, list[str]] = {}
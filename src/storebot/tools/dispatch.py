@@ -6,8 +6,10 @@ Used by both ``agent.py`` (Claude API loop) and ``mcp_server.py`` (MCP server).
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from collections.abc import Callable
+from typing import TYPE_CHECKING, NamedTuple
 
+from storebot.tools.definitions import TOOLS
 from storebot.tools.schemas import validate_tool_result
 
 if TYPE_CHECKING:
@@ -196,8 +198,97 @@ def create_services(settings: Settings, engine: sa.Engine | None) -> dict[str, o
     }
 
 
-def execute_tool(services: dict[str, object], name: str, tool_input: dict) -> dict:
-    """Execute a tool by name using the provided services dict.
+# Containers vs scalars per JSON Schema type. Only mismatches across that
+# divide are rejected up front; finer coercion ("42" for an integer) is left
+# to the services, which already handle it.
+_CONTAINER_TYPES = {"object": dict, "array": list}
+
+
+class _InputSpec(NamedTuple):
+    required: tuple[str, ...]
+    allowed: frozenset[str] | None  # None when additional properties are allowed
+    types: tuple[tuple[str, tuple[str, ...]], ...]  # (property, accepted JSON Schema types)
+
+
+def _compile_input_spec(schema: dict) -> _InputSpec:
+    properties = schema.get("properties", {})
+    return _InputSpec(
+        required=tuple(schema.get("required", ())),
+        allowed=(frozenset(properties) if schema.get("additionalProperties") is False else None),
+        # "type" may be one name or a list of them, e.g. ["string", "null"]
+        types=tuple(
+            (key, (prop["type"],) if isinstance(prop["type"], str) else tuple(prop["type"]))
+            for key, prop in properties.items()
+            if "type" in prop
+        ),
+    )
+
+
+_INPUT_SPECS: dict[str, _InputSpec] = {
+    t["name"]: _compile_input_spec(t["input_schema"]) for t in TOOLS
+}
+
+
+def _input_error(spec: _InputSpec, tool_input: dict) -> str | None:
+    """Return why ``tool_input`` does not fit the tool schema, or None."""
+    missing = [key for key in spec.required if key not in tool_input]
+    if missing:
+        return f"missing required field(s): {', '.join(missing)}"
+    if spec.allowed is not None:
+        unknown = [key for key in tool_input if key not in spec.allowed]
+        if unknown:
+            return f"unknown field(s): {', '.join(unknown)}"
+    for key, json_types in spec.types:
+        if key in tool_input and not any(
+            _fits_type(tool_input[key], json_type) for json_type in json_types
+        ):
+            return f"'{key}' must be {' or '.join(json_types)}"
+    return None
+
+
+def _fits_type(value, json_type: str) -> bool:
+    if json_type == "null":
+        return value is None
+    container = _CONTAINER_TYPES.get(json_type)
+    if container is not None:
+        return isinstance(value, container)
+    return not isinstance(value, (dict, list))
+
+
+class _UnavailableTool:
+    """Handler for a tool whose service is missing; returns a fixed error."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: str) -> None:
+        self.error = error
+
+    def __call__(self, **_kwargs) -> dict:
+        return {"error": self.error}
+
+
+def bind_handlers(services: dict[str, object]) -> dict[str, Callable[..., dict]]:
+    """Resolve DISPATCH against ``services`` once, returning tool name → callable.
+
+    Available tools map to their bound service method. Tools whose service is
+    missing map to a stub returning a pre-formatted "not available" error, so
+    ``execute_tool`` needs a single lookup per call.
+    """
+    handlers: dict[str, Callable[..., dict]] = {}
+    for name, (service_attr, method_name) in DISPATCH.items():
+        service = services.get(service_attr)
+        if service is not None:
+            handlers[name] = getattr(service, method_name)
+        elif service_attr in DB_SERVICES:
+            error = f"{DB_SERVICES[service_attr]} not available (no database engine)"
+            handlers[name] = _UnavailableTool(error)
+        else:
+            handlers[name] = _UnavailableTool(f"Service '{service_attr}' not available")
+    return handlers
+
+
+def execute_tool(handlers: dict[str, Callable[..., dict]], name: str, tool_input: dict) -> dict:
+    """Execute a tool by name using a handler table from ``bind_handlers``.
 
     Thread-safe: each service method creates its own ``Session(engine)``
     context for DB access.
@@ -210,24 +301,29 @@ def execute_tool(services: dict[str, object], name: str, tool_input: dict) -> di
 
     cleaned = strip_nulls(tool_input) or {}
 
-    logger.debug(
-        "Executing tool: %s with keys: %s", name, list(cleaned.keys()), extra={"tool_name": name}
-    )
+    # Only key names are logged — values can hold base64 images or long
+    # draft bodies — and the key list is built only when DEBUG is enabled.
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Executing tool: %s with keys: %s", name, list(cleaned), extra={"tool_name": name}
+        )
 
-    entry = DISPATCH.get(name)
-    if entry is None:
+    handler = handlers.get(name)
+    if handler is None:
         return {"error": f"Unknown tool: {name}"}
 
-    service_attr, method_name = entry
-    service = services.get(service_attr)
-    if service is None:
-        if service_attr in DB_SERVICES:
-            return {"error": f"{DB_SERVICES[service_attr]} not available (no database engine)"}
-        return {"error": f"Service '{service_attr}' not available"}
+    # A missing service is reported as such, whatever the input.
+    spec = _INPUT_SPECS.get(name)
+    if spec is not None and not isinstance(handler, _UnavailableTool):
+        problem = _input_error(spec, cleaned)
+        if problem:
+            logger.warning(
+                "Tool input validation failed: %s — %s", name, problem, extra={"tool_name": name}
+            )
+            return {"error": f"Invalid arguments for '{name}': {problem}"}
 
     try:
-        result = getattr(service, method_name)(**cleaned)
-        return validate_tool_result(name, result)
+        return validate_tool_result(name, handler(**cleaned))
     except TypeError as e:
         logger.warning("Tool input validation failed: %s — %s", name, e, extra={"tool_name": name})
         return {"error": f"Invalid arguments for '{name}': {e}"}
@@ -1,5 +1,7 @@
 import base64
+import functools
 import io
+import os
 from pathlib import Path
 
 from PIL import Image, ImageOps
@@ -65,11 +67,19 @@ def encode_image_base64(image_path: str) -> tuple[str, str]:
     """Read image file and return (base64_data, media_type).
 
     Re-encodes through PIL to strip EXIF metadata (GPS, camera serial, etc.)
-    before base64-encoding.
+    before base64-encoding. Results are cached on path, mtime and size, so the
+    same photo re-encoded on every conversation turn is only processed once.
     """
+    st = os.stat(image_path)
+    return _encode_image_cached(image_path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=32)
+def _encode_image_cached(image_path: str, mtime_ns: int, size: int) -> tuple[str, str]:
+    """Encode an image; ``mtime_ns`` and ``size`` only invalidate the cache key."""
     with Image.open(image_path) as img:
         img = _prepare_for_jpeg(img)
         buf = io.BytesIO()
         img.save(buf, format="JPEG", quality=90)
         data = buf.getvalue()
-    return base64.b64encode(data).decode("utf-8"), "image/jpeg"
+    return base64.b64encode(data).decode("ascii"), "image/jpeg"
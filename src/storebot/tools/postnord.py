@@ -5,6 +5,7 @@ PostNord Booking & Shipping API (REST).
 """
 
 import base64
+import functools
 import logging
 import re
 from dataclasses import dataclass
@@ -90,7 +91,11 @@ class PostNordClient:
         self.api_key = api_key
         self.sender = sender
         self.base_url = SANDBOX_URL if sandbox else PRODUCTION_URL
-        self.session = requests.Session()
+
+    @functools.cached_property
+    def session(self) -> requests.Session:
+        """HTTP session, created on the first label request."""
+        return requests.Session()
 
     @staticmethod
     def _address_to_payload(addr: Address) -> dict:
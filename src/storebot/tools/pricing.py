@@ -1,5 +1,6 @@
 import logging
 import statistics
+from concurrent.futures import ThreadPoolExecutor
 
 from sqlalchemy.orm import Session
 
@@ -19,6 +20,11 @@ class PricingService:
         self.tradera = tradera
         self.blocket = blocket
         self.engine = engine
+        # Long-lived so the Tradera client's per-thread HTTP session is reused
+        # across price checks instead of rebuilt with each pool.
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="storebot-pricing"
+        )
 
     def price_check(
         self,
@@ -26,8 +32,11 @@ class PricingService:
         product_id: int | None = None,
         category: str | None = None,
     ) -> dict:
-        tradera_result = self._search_tradera(query, category)
+        # Both searches are independent HTTP round-trips; run them side by side
+        # so latency is the slower of the two rather than their sum.
+        tradera_future = self._search_pool.submit(self._search_tradera, query, category)
         blocket_result = self._search_blocket(query, category)
+        tradera_result = tradera_future.result()
 
         tradera_comparables = [
             _normalize_comparable(item, "tradera") for item in tradera_result.get("items", [])
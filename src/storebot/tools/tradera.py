@@ -1,9 +1,13 @@
 import logging
+import threading
+import time
+from collections.abc import Callable
 from datetime import UTC, datetime, timedelta
 
 import requests
 import zeep
 from lxml import etree
+from requests_file import FileAdapter
 from zeep.plugins import HistoryPlugin
 from zeep.transports import Transport
 
@@ -20,6 +24,39 @@ def _parse_int_config(value: str, name: str) -> int:
         raise ValueError(f"{name} must be an integer, got: {value!r}")
 
 
+class _ThreadSessionTransport(Transport):
+    """zeep Transport whose ``session`` is the calling thread's requests.Session.
+
+    Sessions live in ``sessions``, a ``threading.local`` shared by every
+    transport of one client, so a thread uses one keep-alive pool for all
+    services while SOAP calls made concurrently from worker threads never
+    share one. ``new_session`` builds a thread's session on first use.
+    """
+
+    def __init__(
+        self,
+        sessions: threading.local,
+        new_session: Callable[[], requests.Session],
+        timeout: int,
+    ):
+        self._sessions = sessions
+        self._new_session = new_session
+        super().__init__(session=self.session, timeout=timeout)
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            session = self._sessions.session = self._new_session()
+        return session
+
+    @session.setter
+    def session(self, value: requests.Session) -> None:
+        # Transport.__init__ assigns the session it was given; it becomes
+        # this thread's session.
+        self._sessions.session = value
+
+
 class TraderaClient:
     """Client for Tradera SOAP API via zeep.
 
@@ -36,6 +73,10 @@ class TraderaClient:
     PUBLIC_WSDL = "https://api.tradera.com/v3/publicservice.asmx?WSDL"
     RESTRICTED_WSDL = "https://api.tradera.com/v3/restrictedservice.asmx?WSDL"
 
+    # Carrier rosters rarely change within a day; caching them saves calls
+    # against the 100/day rate limit.
+    SHIPPING_OPTIONS_TTL_SECONDS = 3600
+
     def __init__(
         self,
         app_id: str,
@@ -55,11 +96,26 @@ class TraderaClient:
         self._order_client = None
         self._public_client = None
         self._restricted_client = None
+        # from_country -> (fetched_at monotonic, parsed options)
+        self._shipping_options_cache: dict[str, tuple[float, list[dict]]] = {}
+        # requests.Session is not documented as thread-safe, and tool calls run
+        # on several worker threads at once, so each thread gets its own.
+        self._sessions = threading.local()
 
-    def _make_transport(self) -> Transport:
+    def _new_session(self) -> requests.Session:
+        """An HTTP session set up the way zeep's Transport sets up its own.
+
+        One is built per thread and shared by all four SOAP services; they
+        talk to the same host, so one keep-alive pool per thread serves all.
+        """
         session = requests.Session()
         session.timeout = self.timeout
-        return Transport(session=session, timeout=self.timeout)
+        session.headers["User-Agent"] = f"Zeep/{zeep.__version__} (www.python-zeep.org)"
+        session.mount("file://", FileAdapter())
+        return session
+
+    def _make_transport(self) -> Transport:
+        return _ThreadSessionTransport(self._sessions, self._new_session, timeout=self.timeout)
 
     @property
     def search_client(self) -> zeep.Client:
@@ -521,18 +577,42 @@ class TraderaClient:
         """Get available shipping options from Tradera.
 
         If weight_grams is provided, filters to options that support the given weight.
+        The unfiltered roster is cached per country for ``SHIPPING_OPTIONS_TTL_SECONDS``
+        unless it came back empty.
         """
         try:
-            request = {"FromCountryCodes": [from_country]}
-            response = self._get_shipping_options_api_call(
-                request, self._auth_headers(self.public_client, include_authorization=True)
-            )
+            options = self._shipping_roster(from_country)
+        except Exception as e:
+            logger.exception("Tradera get_shipping_options failed")
+            return {"error": str(e)}
 
-            spans = getattr(response, "ProductsPerWeightSpan", None)
-            if not spans:
-                return {"shipping_options": []}
+        # The roster is cached; hand out copies of its (flat) option dicts so
+        # callers cannot edit what the next call returns.
+        if weight_grams is not None:
+            options = [
+                dict(opt)
+                for opt in options
+                if (limit := opt["weight_limit_grams"]) is None or limit >= weight_grams
+            ]
+            return {"shipping_options": options, "filtered_by_weight_grams": weight_grams}
+
+        return {"shipping_options": [dict(opt) for opt in options]}
+
+    def _shipping_roster(self, from_country: str) -> list[dict]:
+        """Return the parsed shipping roster for a country, fetching on cache miss."""
+        cached = self._shipping_options_cache.get(from_country)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < self.SHIPPING_OPTIONS_TTL_SECONDS:
+            return cached[1]
+
+        request = {"FromCountryCodes": [from_country]}
+        response = self._get_shipping_options_api_call(
+            request, self._auth_headers(self.public_client, include_authorization=True)
+        )
 
-            options = []
+        options = []
+        spans = getattr(response, "ProductsPerWeightSpan", None)
+        if spans:
             # ArrayOfProductsPerWeightSpan → ProductsPerWeightSpan elements
             span_list = getattr(spans, "ProductsPerWeightSpan", None) or spans
             if not hasattr(span_list, "__iter__"):
@@ -551,20 +631,10 @@ class TraderaClient:
                 for prod in prod_list:
                     options.append(self._parse_shipping_product(prod, weight_limit))
 
-            if weight_grams is not None:
-                options = [
-                    opt
-                    for opt in options
-                    if opt.get("weight_limit_grams") is None
-                    or opt["weight_limit_grams"] >= weight_grams
-                ]
-                return {"shipping_options": options, "filtered_by_weight_grams": weight_grams}
-
-            return {"shipping_options": options}
-
-        except Exception as e:
-            logger.exception("Tradera get_shipping_options failed")
-            return {"error": str(e)}
+        # An empty roster is likely a transient upstream hiccup; retry next call
+        if options:
+            self._shipping_options_cache[from_country] = (now, options)
+        return options
 
     @staticmethod
     def _parse_shipping_product(prod, weight_limit: int | None) -> dict:
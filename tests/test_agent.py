@@ -1,5 +1,10 @@
 """Tests for agent.py — coverage of uncovered lines."""
 
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
 from decimal import Decimal
 from unittest.mock import MagicMock, patch
@@ -8,8 +13,16 @@ import pytest
 import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
-from storebot.agent import Agent, _detect_categories, _json_default
+from storebot.agent import (
+    Agent,
+    _detect_categories,
+    _encode_tool_result,
+    _json_default,
+    _requires_streaming,
+    _with_cache_breakpoints,
+)
 from storebot.db import Base, TraderaCategory
+from storebot.tools.dispatch import bind_handlers
 
 
 @pytest.fixture
@@ -98,6 +111,56 @@ class TestJsonDefault:
             _json_default(object())
 
 
+class TestEncodeToolResult:
+    def test_compact_and_non_ascii(self):
+        assert _encode_tool_result({"titel": "Stol", "pris": Decimal("350.5")}) == (
+            '{"titel":"Stol","pris":350.5}'
+        )
+        assert _encode_tool_result({"namn": "Pinnstol i björk"}) == '{"namn":"Pinnstol i björk"}'
+
+
+class TestWithCacheBreakpoints:
+    def test_string_content_becomes_marked_text_block(self):
+        messages = [{"role": "user", "content": "Hej"}]
+        marked = _with_cache_breakpoints(messages)
+        assert marked[-1]["content"] == [
+            {"type": "text", "text": "Hej", "cache_control": {"type": "ephemeral"}}
+        ]
+        assert messages == [{"role": "user", "content": "Hej"}]
+
+    def test_marks_last_block_without_mutating_history(self):
+        tool_result = {"type": "tool_result", "tool_use_id": "t1", "content": "{}"}
+        messages = [
+            {"role": "user", "content": "Hej"},
+            {"role": "user", "content": [tool_result]},
+        ]
+        marked = _with_cache_breakpoints(messages)
+        assert marked[0] is messages[0]
+        assert marked[-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in tool_result
+
+    def test_marks_end_of_stored_history(self):
+        messages = [
+            {"role": "user", "content": "Hej"},
+            {"role": "assistant", "content": [{"type": "text", "text": "Hej!"}]},
+            {"role": "user", "content": "Vad kostar stolen?"},
+        ]
+        marked = _with_cache_breakpoints(messages, history_len=2)
+        assert marked[0] is messages[0]
+        assert marked[1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert marked[2]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in messages[1]["content"][-1]
+
+    def test_skips_empty_text_and_non_dict_blocks(self):
+        empty = [{"role": "user", "content": ""}]
+        assert _with_cache_breakpoints(empty) == empty
+        empty_block = [{"role": "user", "content": [{"type": "text", "text": ""}]}]
+        assert _with_cache_breakpoints(empty_block) == empty_block
+        sdk_blocks = [{"role": "assistant", "content": [MagicMock()]}]
+        assert _with_cache_breakpoints(sdk_blocks)[0] is sdk_blocks[0]
+        assert _with_cache_breakpoints([]) == []
+
+
 class TestCallApiThinking:
     def test_thinking_enabled_on_primary_model(self, engine):
         settings = _make_settings(claude_thinking_budget=2048)
@@ -124,6 +187,74 @@ class TestCallApiThinking:
         assert "thinking" not in call_kwargs
 
 
+class TestCallApiSystemPrompt:
+    def test_system_blocks_reused_and_cached(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        agent.client.messages.create = MagicMock(return_value=_make_api_response())
+
+        agent._call_api([{"role": "user", "content": "a"}])
+        agent._call_api([{"role": "user", "content": "b"}])
+
+        first, second = (c.kwargs["system"] for c in agent.client.messages.create.call_args_list)
+        assert first is second
+        assert first[0]["cache_control"] == {"type": "ephemeral"}
+
+
+class TestCallApiStreaming:
+    def test_default_max_tokens_uses_create(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        agent.client.messages.create = MagicMock(return_value=_make_api_response())
+        agent.client.messages.stream = MagicMock()
+
+        agent._call_api([{"role": "user", "content": "test"}])
+
+        agent.client.messages.create.assert_called_once()
+        agent.client.messages.stream.assert_not_called()
+
+    def test_large_max_tokens_streams(self, engine):
+        agent = Agent(settings=_make_settings(claude_max_tokens=64000), engine=engine)
+        final = _make_api_response(text="Långt svar")
+        stream = MagicMock()
+        stream.__enter__.return_value.get_final_message.return_value = final
+        agent.client.messages.create = MagicMock()
+        agent.client.messages.stream = MagicMock(return_value=stream)
+
+        response = agent._call_api([{"role": "user", "content": "test"}])
+
+        assert response is final
+        assert agent.client.messages.stream.call_args.kwargs["max_tokens"] == 64000
+        agent.client.messages.create.assert_not_called()
+
+    def test_model_nonstreaming_cap_streams(self, engine):
+        # Opus 4.0 refuses blocking calls above 8192 max_tokens, well under 16000.
+        agent = Agent(settings=_make_settings(claude_model="claude-opus-4-0"), engine=engine)
+        final = _make_api_response(text="Svar")
+        stream = MagicMock()
+        stream.__enter__.return_value.get_final_message.return_value = final
+        agent.client.messages.create = MagicMock()
+        agent.client.messages.stream = MagicMock(return_value=stream)
+
+        response = agent._call_api([{"role": "user", "content": "test"}])
+
+        assert response is final
+        assert agent.client.messages.stream.call_args.kwargs["model"] == "claude-opus-4-0"
+        agent.client.messages.create.assert_not_called()
+
+
+class TestRequiresStreaming:
+    def test_general_limit(self):
+        assert not _requires_streaming("claude-sonnet-4-6", 21_333)
+        assert _requires_streaming("claude-sonnet-4-6", 21_334)
+
+    def test_opus_4_and_4_1_capped_lower(self):
+        for model in ("claude-opus-4-0", "claude-opus-4-20250514", "claude-opus-4-1-20250805"):
+            assert not _requires_streaming(model, 8_192)
+            assert _requires_streaming(model, 8_193)
+
+    def test_later_opus_uses_general_limit(self):
+        assert not _requires_streaming("claude-opus-4-6", 16_000)
+
+
 class TestCallApiError:
     def test_api_error_logged_and_reraised(self, engine):
         import anthropic
@@ -166,6 +297,75 @@ class TestHandleMessageImages:
         assert isinstance(img_msg["content"], list)
         assert any(b.get("type") == "image" for b in img_msg["content"])
 
+    def test_multiple_images_keep_order(self, engine):
+        settings = _make_settings()
+        agent = Agent(settings=settings, engine=engine)
+        agent.client.messages.create = MagicMock(return_value=_make_api_response())
+
+        with patch(
+            "storebot.agent.encode_image_base64",
+            side_effect=lambda path: (f"data:{path}", "image/jpeg"),
+        ):
+            result = agent.handle_message(
+                "", image_paths=["/tmp/a.jpg", "/tmp/b.jpg", "/tmp/c.jpg"]
+            )
+
+        blocks = result.messages[0]["content"]
+        images = [b["source"]["data"] for b in blocks if b.get("type") == "image"]
+        assert images == ["data:/tmp/a.jpg", "data:/tmp/b.jpg", "data:/tmp/c.jpg"]
+
+    def test_photo_without_caption_gets_cache_breakpoint(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        agent.client.messages.create = MagicMock(return_value=_make_api_response())
+
+        with patch("storebot.agent.encode_image_base64", return_value=("data", "image/jpeg")):
+            result = agent.handle_message("", image_paths=["/tmp/a.jpg"])
+
+        sent = agent.client.messages.create.call_args.kwargs["messages"][-1]["content"]
+        assert sent[-1]["type"] == "text"
+        assert sent[-1]["cache_control"] == {"type": "ephemeral"}
+        # The base64 image block is shared, not copied, and stays unmarked
+        assert sent[0] is result.messages[0]["content"][0]
+        assert "cache_control" not in sent[0]
+
+
+class TestLazyClient:
+    def test_client_built_on_first_use(self, engine):
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            agent = Agent(settings=_make_settings(), engine=engine)
+            mock_anthropic.assert_not_called()
+
+            assert agent.client is agent.client
+            mock_anthropic.assert_called_once_with(api_key="test")
+
+    def test_concurrent_first_use_builds_one_client(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        start = threading.Barrier(4)
+
+        def slow_client(**kwargs):
+            time.sleep(0.05)
+            return MagicMock()
+
+        def first_use():
+            start.wait()
+            return agent.client
+
+        with (
+            patch("anthropic.Anthropic", side_effect=slow_client) as mock_anthropic,
+            ThreadPoolExecutor(max_workers=4) as pool,
+        ):
+            clients = list(pool.map(lambda _: first_use(), range(4)))
+
+        mock_anthropic.assert_called_once()
+        assert all(c is clients[0] for c in clients)
+
+    def test_sdk_not_imported_with_module(self):
+        code = "import sys, storebot.agent; print('anthropic' in sys.modules)"
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        assert out.strip() == "False"
+
 
 class TestSelectModel:
     def test_simple_model_used(self, engine):
@@ -200,6 +400,7 @@ class TestExecuteToolDispatch:
         settings = _make_settings()
         agent = Agent(settings=settings, engine=engine)
         agent._services["listing"] = None  # Simulate missing service
+        agent._handlers = bind_handlers(agent._services)
         result = agent.execute_tool("list_draft_listings", {})
         assert "error" in result
         assert "not available" in result["error"]
@@ -207,9 +408,23 @@ class TestExecuteToolDispatch:
     def test_type_error_in_tool(self, engine):
         settings = _make_settings()
         agent = Agent(settings=settings, engine=engine)
-        # Pass wrong arguments to trigger TypeError
-        result = agent.execute_tool("search_tradera", {"invalid_param_xyz": True})
-        assert "error" in result
+        # Schema-valid input, so the call reaches the service and its TypeError
+        mock_tradera = MagicMock()
+        mock_tradera.search = MagicMock(side_effect=TypeError("bad args"))
+        agent._services["tradera"] = mock_tradera
+        agent._handlers = bind_handlers(agent._services)
+        result = agent.execute_tool("search_tradera", {"query": "test"})
+        assert result == {"error": "Invalid arguments for 'search_tradera': bad args"}
+
+    def test_missing_required_field_in_tool(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        result = agent.execute_tool("search_tradera", {})
+        assert "missing required field(s): query" in result["error"]
+
+    def test_unknown_field_in_tool(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        result = agent.execute_tool("search_tradera", {"query": "stol", "invalid_param_xyz": True})
+        assert "unknown field(s): invalid_param_xyz" in result["error"]
 
     def test_general_exception_in_tool(self, engine):
         settings = _make_settings()
@@ -218,11 +433,110 @@ class TestExecuteToolDispatch:
         mock_pricing = MagicMock()
         mock_pricing.price_check = MagicMock(side_effect=RuntimeError("boom"))
         agent._services["pricing"] = mock_pricing
+        agent._handlers = bind_handlers(agent._services)
         result = agent.execute_tool("price_check", {"query": "test"})
         assert "error" in result
         assert "boom" in result["error"]
 
 
+class TestToolResultCache:
+    def _agent(self, engine, blocket):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        agent._services["blocket"] = blocket
+        agent._handlers = bind_handlers(agent._services)
+        return agent
+
+    def test_repeat_read_only_call_hits_cache(self, engine):
+        blocket = MagicMock()
+        blocket.search.return_value = {"items": [{"id": "1"}]}
+        agent = self._agent(engine, blocket)
+
+        first = agent.execute_tool("search_blocket", {"query": "stol"})
+        second = agent.execute_tool("search_blocket", {"query": "stol"})
+
+        assert first == second == {"items": [{"id": "1"}]}
+        blocket.search.assert_called_once()
+
+    def test_different_input_misses(self, engine):
+        blocket = MagicMock()
+        blocket.search.return_value = {"items": []}
+        agent = self._agent(engine, blocket)
+
+        agent.execute_tool("search_blocket", {"query": "stol"})
+        agent.execute_tool("search_blocket", {"query": "bord"})
+
+        assert blocket.search.call_count == 2
+
+    def test_expired_entry_refetched(self, engine):
+        blocket = MagicMock()
+        blocket.search.return_value = {"items": []}
+        agent = self._agent(engine, blocket)
+
+        with patch("storebot.agent.time.monotonic", side_effect=[0.0, 10_000.0]):
+            agent.execute_tool("search_blocket", {"query": "stol"})
+            agent.execute_tool("search_blocket", {"query": "stol"})
+
+        assert blocket.search.call_count == 2
+
+    def test_get_categories_cached(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        with patch.object(
+            agent, "_execute_get_categories", return_value={"categories": []}
+        ) as query:
+            agent.execute_tool("get_categories", {"query": "möbler"})
+            agent.execute_tool("get_categories", {"query": "möbler"})
+
+        query.assert_called_once_with({"query": "möbler"})
+
+    def test_errors_not_cached(self, engine):
+        blocket = MagicMock()
+        blocket.search.side_effect = [{"error": "timeout"}, {"items": []}]
+        agent = self._agent(engine, blocket)
+
+        agent.execute_tool("search_blocket", {"query": "stol"})
+        result = agent.execute_tool("search_blocket", {"query": "stol"})
+
+        assert result == {"items": []}
+
+    def test_mutating_result_does_not_change_cache(self, engine):
+        blocket = MagicMock()
+        blocket.search.return_value = {"items": [{"id": "1"}]}
+        agent = self._agent(engine, blocket)
+
+        first = agent.execute_tool("search_blocket", {"query": "stol"})
+        first["items"].append({"id": "2"})
+        second = agent.execute_tool("search_blocket", {"query": "stol"})
+        second["items"].clear()
+        third = agent.execute_tool("search_blocket", {"query": "stol"})
+
+        assert third == {"items": [{"id": "1"}]}
+        blocket.search.assert_called_once()
+
+    def test_price_check_not_cached(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        agent.pricing = MagicMock()
+        agent.pricing.price_check = MagicMock(return_value={"tradera": {}, "blocket": {}})
+        agent._services["pricing"] = agent.pricing
+        agent._handlers = bind_handlers(agent._services)
+
+        agent.execute_tool("price_check", {"query": "stol", "product_id": 1})
+        agent.execute_tool("price_check", {"query": "stol", "product_id": 1})
+
+        assert agent.pricing.price_check.call_count == 2
+
+    def test_side_effecting_tool_not_cached(self, engine):
+        listing = MagicMock()
+        listing.publish_listing.return_value = {"ok": True}
+        agent = Agent(settings=_make_settings(), engine=engine)
+        agent._services["listing"] = listing
+        agent._handlers = bind_handlers(agent._services)
+
+        agent.execute_tool("publish_listing", {"listing_id": 1})
+        agent.execute_tool("publish_listing", {"listing_id": 1})
+
+        assert listing.publish_listing.call_count == 2
+
+
 class TestRequestToolsInvalidCategories:
     def test_invalid_categories_filtered(self, engine):
         settings = _make_settings()
@@ -237,6 +551,27 @@ class TestRequestToolsInvalidCategories:
         assert result.text == "Done"
 
 
+class TestToolPool:
+    def test_parallel_tools_reuse_threads_across_turns(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        threads = []
+
+        def _execute(name, tool_input):
+            threads.append(threading.current_thread())
+            return {"ok": True}
+
+        agent._execute_tool_safely = _execute
+        blocks = [
+            _make_tool_block("search_tradera", {"query": "stol"}, tool_id="t1"),
+            _make_tool_block("search_blocket", {"query": "stol"}, tool_id="t2"),
+        ]
+        agent._run_tool_blocks(blocks)
+        agent._run_tool_blocks(blocks)
+
+        assert len(threads) == 4
+        assert all(t.name.startswith("storebot-tool") and t.is_alive() for t in threads)
+
+
 class TestParallelToolException:
     def test_parallel_exception_caught(self, engine):
         settings = _make_settings()
@@ -473,6 +808,7 @@ class TestExecuteToolNotImplemented:
         mock_listing = MagicMock()
         mock_listing.list_drafts = MagicMock(side_effect=NotImplementedError())
         agent._services["listing"] = mock_listing
+        agent._handlers = bind_handlers(agent._services)
         result = agent.execute_tool("list_draft_listings", {})
         assert "not yet implemented" in result["error"]
 
@@ -485,6 +821,7 @@ class TestExecuteToolServiceNotInDb:
         # tradera is not a DB service — setting it to None exercises
         # the generic "not available" branch in dispatch.execute_tool
         agent._services["tradera"] = None
+        agent._handlers = bind_handlers(agent._services)
         result = agent.execute_tool("search_tradera", {})
         assert "not available" in result["error"]
 
@@ -593,3 +930,12 @@ class TestExecuteToolGetCategoriesDispatch:
         result = agent.execute_tool("get_categories", {})
         assert "categories" in result
         assert result["categories"][0]["name"] == "Testkat"
+
+    def test_get_categories_in_handler_table(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        assert agent._handlers["get_categories"] == agent._get_categories_tool
+
+    def test_get_categories_non_dict_input(self, engine):
+        agent = Agent(settings=_make_settings(), engine=engine)
+        result = agent.execute_tool("get_categories", "möbler")
+        assert "expected dict" in result["error"]
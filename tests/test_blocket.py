@@ -1,4 +1,5 @@
 import json
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -104,7 +105,7 @@ def _make_ad_html(item_data):
 
 
 class TestBlocketSearch:
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_returns_formatted_results(self, mock_get, client):
         doc1 = _make_doc(ad_id=1, heading="Byrå", price={"amount": 1200, "currency_code": "SEK"})
         doc2 = _make_doc(ad_id=2, heading="Lampa", price={"amount": 350, "currency_code": "SEK"})
@@ -129,7 +130,7 @@ class TestBlocketSearch:
         assert result["items"][1]["title"] == "Lampa"
         assert result["items"][1]["price"] == 350
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_empty_results(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -143,7 +144,7 @@ class TestBlocketSearch:
         assert result["items"] == []
         assert "error" not in result
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_passes_query_params(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -160,7 +161,7 @@ class TestBlocketSearch:
         assert params["location"] == "0.300012"
         assert params["page"] == 2
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_sends_user_agent_only(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -175,7 +176,7 @@ class TestBlocketSearch:
         assert headers["User-Agent"] == USER_AGENT
         assert "Authorization" not in headers
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_handles_http_error(self, mock_get, client):
         mock_get.side_effect = requests.ConnectionError("Connection refused")
 
@@ -186,7 +187,7 @@ class TestBlocketSearch:
         assert result["total"] == 0
         assert result["items"] == []
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_default_params(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -207,7 +208,7 @@ class TestBlocketSearch:
         assert "price_from" not in params
         assert "price_to" not in params
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_item_fields(self, mock_get, client):
         doc = _make_doc()
         mock_resp = MagicMock()
@@ -229,7 +230,7 @@ class TestBlocketSearch:
         assert item["published"] == 1770668084000
         assert item["trade_type"] == "Säljes"
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_passes_price_filters(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -243,7 +244,7 @@ class TestBlocketSearch:
         assert params["price_from"] == 100
         assert params["price_to"] == 5000
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_search_passes_sort(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -262,6 +263,29 @@ class TestBlocketSearch:
 # ---------------------------------------------------------------------------
 
 
+class TestBlocketSession:
+    @patch("storebot.tools.blocket.requests.Session.get")
+    def test_requests_reuse_one_session(self, mock_get, client):
+        mock_resp = MagicMock()
+        mock_resp.status_code = 200
+        mock_resp.json.return_value = _make_response(docs=[])
+        mock_get.return_value = mock_resp
+
+        session = client.session
+        client.search("stol")
+        client.search("bord")
+
+        assert client.session is session
+        assert mock_get.call_count == 2
+
+    def test_each_thread_gets_its_own_session(self, client):
+        other = []
+        worker = threading.Thread(target=lambda: other.append(client.session))
+        worker.start()
+        worker.join()
+        assert other[0] is not client.session
+
+
 class TestBlocketEnums:
     def test_category_values(self):
         assert Category.MOBLER_OCH_INREDNING == "0.78"
@@ -284,7 +308,7 @@ class TestBlocketEnums:
 
 class TestBlocketRetry:
     @patch("storebot.retry.time.sleep")
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_retries_on_5xx(self, mock_get, mock_sleep, client):
         resp_500 = MagicMock()
         resp_500.status_code = 500
@@ -309,7 +333,7 @@ class TestBlocketRetry:
 
 
 class TestBlocketGetAd:
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_returns_full_detail(self, mock_get, client):
         item_data = _make_hydration_data()
         mock_resp = MagicMock()
@@ -339,7 +363,7 @@ class TestBlocketGetAd:
         assert result["parameters"]["Märke"] == "Okänt"
         assert result["seller"] == {"name": "", "id": ""}
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_calls_correct_url(self, mock_get, client):
         item_data = _make_hydration_data()
         mock_resp = MagicMock()
@@ -355,7 +379,7 @@ class TestBlocketGetAd:
         assert call_args.args[0] == expected_url
         assert call_args.kwargs["timeout"] == 15
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_handles_not_found(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 404
@@ -367,7 +391,7 @@ class TestBlocketGetAd:
         assert "404" in result["error"]
         assert "99999999" in result["error"]
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_handles_connection_error(self, mock_get, client):
         mock_get.side_effect = requests.ConnectionError("Connection refused")
 
@@ -376,7 +400,7 @@ class TestBlocketGetAd:
         assert "error" in result
         assert "Connection refused" in result["error"]
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_missing_hydration_data(self, mock_get, client):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -389,7 +413,7 @@ class TestBlocketGetAd:
         assert "error" in result
         assert "Could not extract" in result["error"]
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_minimal_fields(self, mock_get, client):
         item_data = {
             "title": "Enkel stol",
@@ -412,7 +436,7 @@ class TestBlocketGetAd:
         assert result["parameters"] == {}
         assert result["seller"] == {"name": "", "id": ""}
 
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_price_as_int(self, mock_get, client):
         item_data = _make_hydration_data(price=1500)
         mock_resp = MagicMock()
@@ -426,7 +450,7 @@ class TestBlocketGetAd:
         assert result["price"] == 1500
 
     @patch("storebot.retry.time.sleep")
-    @patch("storebot.tools.blocket.requests.get")
+    @patch("storebot.tools.blocket.requests.Session.get")
     def test_get_ad_retries_on_5xx(self, mock_get, mock_sleep, client):
         resp_500 = MagicMock()
         resp_500.status_code = 500
@@ -1,3 +1,4 @@
+import os
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -110,29 +111,29 @@ class TestParseRedirectUrl:
 
 
 class TestAuthorizeTraderaCLI:
-    @patch("storebot.cli.Settings")
-    def test_missing_app_id_exits(self, mock_settings_cls):
-        mock_settings_cls.return_value = _mock_settings(tradera_app_id="")
+    @patch("storebot.cli.get_settings")
+    def test_missing_app_id_exits(self, mock_get_settings):
+        mock_get_settings.return_value = _mock_settings(tradera_app_id="")
 
         with pytest.raises(SystemExit) as exc_info:
             authorize_tradera()
         assert exc_info.value.code == 1
 
-    @patch("storebot.cli.Settings")
-    def test_missing_public_key_exits(self, mock_settings_cls):
-        mock_settings_cls.return_value = _mock_settings(tradera_public_key="")
+    @patch("storebot.cli.get_settings")
+    def test_missing_public_key_exits(self, mock_get_settings):
+        mock_get_settings.return_value = _mock_settings(tradera_public_key="")
 
         with pytest.raises(SystemExit) as exc_info:
             authorize_tradera()
         assert exc_info.value.code == 1
 
     @patch("storebot.cli.TraderaClient")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
     def test_successful_flow_saves_to_env(
-        self, mock_input, mock_settings_cls, mock_tradera_cls, tmp_path, monkeypatch
+        self, mock_input, mock_get_settings, mock_tradera_cls, tmp_path, monkeypatch
     ):
-        mock_settings_cls.return_value = _mock_settings()
+        mock_get_settings.return_value = _mock_settings()
         mock_tradera = MagicMock()
         mock_tradera.fetch_token.return_value = {
             "token": "fetched-real-token",
@@ -155,12 +156,12 @@ class TestAuthorizeTraderaCLI:
         mock_tradera.fetch_token.assert_called_once()
 
     @patch("storebot.cli.TraderaClient")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
     def test_successful_flow_no_save(
-        self, mock_input, mock_settings_cls, mock_tradera_cls, capsys
+        self, mock_input, mock_get_settings, mock_tradera_cls, capsys
     ):
-        mock_settings_cls.return_value = _mock_settings()
+        mock_get_settings.return_value = _mock_settings()
         mock_tradera = MagicMock()
         mock_tradera.fetch_token.return_value = {
             "token": "fetched-real-token",
@@ -179,10 +180,10 @@ class TestAuthorizeTraderaCLI:
         assert "TRADERA_USER_ID=999" in output
         assert "securely" in output
 
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
-    def test_empty_url_exits(self, mock_input, mock_settings_cls):
-        mock_settings_cls.return_value = _mock_settings()
+    def test_empty_url_exits(self, mock_input, mock_get_settings):
+        mock_get_settings.return_value = _mock_settings()
         mock_input.side_effect = [""]
 
         with pytest.raises(SystemExit) as exc_info:
@@ -190,13 +191,13 @@ class TestAuthorizeTraderaCLI:
         assert exc_info.value.code == 1
 
     @patch("storebot.cli.TraderaClient")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
     def test_fallback_to_redirect_token(
-        self, mock_input, mock_settings_cls, mock_tradera_cls, tmp_path, monkeypatch
+        self, mock_input, mock_get_settings, mock_tradera_cls, tmp_path, monkeypatch
     ):
         """When FetchToken fails but redirect URL has a token, use that."""
-        mock_settings_cls.return_value = _mock_settings()
+        mock_get_settings.return_value = _mock_settings()
         mock_tradera = MagicMock()
         mock_tradera.fetch_token.return_value = {
             "error": "FetchToken response missing AuthToken",
@@ -217,13 +218,13 @@ class TestAuthorizeTraderaCLI:
         assert "TRADERA_USER_ID=999" in content
 
     @patch("storebot.cli.TraderaClient")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
     def test_fetch_token_error_no_fallback_exits(
-        self, mock_input, mock_settings_cls, mock_tradera_cls
+        self, mock_input, mock_get_settings, mock_tradera_cls
     ):
         """When FetchToken fails and redirect URL has no token, exit."""
-        mock_settings_cls.return_value = _mock_settings()
+        mock_get_settings.return_value = _mock_settings()
         mock_tradera = MagicMock()
         mock_tradera.fetch_token.return_value = {"error": "Token not found"}
         mock_tradera_cls.return_value = mock_tradera
@@ -240,7 +241,7 @@ class TestUpdateEnvFile:
         env_file = tmp_path / ".env"
         env_file.write_text("FOO=old\nBAR=baz\n")
 
-        _update_env_file(env_file, "FOO", "new")
+        _update_env_file(env_file, {"FOO": "new"})
 
         content = env_file.read_text()
         assert "FOO=new" in content
@@ -251,7 +252,7 @@ class TestUpdateEnvFile:
         env_file = tmp_path / ".env"
         env_file.write_text("TOKEN=old\n")
 
-        _update_env_file(env_file, "TOKEN", r"abc\1def")
+        _update_env_file(env_file, {"TOKEN": r"abc\1def"})
 
         content = env_file.read_text()
         assert r"TOKEN=abc\1def" in content
@@ -260,7 +261,7 @@ class TestUpdateEnvFile:
         env_file = tmp_path / ".env"
         env_file.write_text("FOO=bar\n")
 
-        _update_env_file(env_file, "NEW_KEY", "value")
+        _update_env_file(env_file, {"NEW_KEY": "value"})
 
         content = env_file.read_text()
         assert "FOO=bar" in content
@@ -269,7 +270,7 @@ class TestUpdateEnvFile:
     def test_create_file_if_missing(self, tmp_path):
         env_file = tmp_path / ".env"
 
-        _update_env_file(env_file, "KEY", "val")
+        _update_env_file(env_file, {"KEY": "val"})
 
         assert env_file.exists()
         assert env_file.read_text() == "KEY=val\n"
@@ -361,29 +362,128 @@ class TestGenerateCategoryDescriptions:
         count = generate_category_descriptions(engine, "test-key", "haiku")
         assert count == 0
 
+    def test_multiple_batches_all_applied(self, engine, capsys):
+        import json
+        import re
+        from datetime import UTC, datetime
+
+        from sqlalchemy.orm import Session
+
+        from storebot.db import TraderaCategory
+
+        with Session(engine) as session:
+            for tid in range(1, 121):
+                session.add(
+                    TraderaCategory(
+                        tradera_id=tid,
+                        name=f"Kategori {tid:03d}",
+                        path=f"Kategori {tid:03d}",
+                        depth=0,
+                        synced_at=datetime.now(UTC),
+                    )
+                )
+            session.commit()
+
+        def _create(**kwargs):
+            ids = re.findall(r"- ID (\d+),", kwargs["messages"][0]["content"])
+            block = MagicMock()
+            block.type = "text"
+            block.text = json.dumps(
+                [{"tradera_id": int(i), "description": f"Beskrivning {i}"} for i in ids]
+            )
+            response = MagicMock()
+            response.content = [block]
+            return response
+
+        with patch("storebot.cli.anthropic.Anthropic") as mock_anthropic:
+            mock_anthropic.return_value.messages.create.side_effect = _create
+            count = generate_category_descriptions(engine, "test-key", "haiku")
+
+        assert count == 120
+        assert mock_anthropic.return_value.messages.create.call_count == 3
+        output = capsys.readouterr().out
+        assert all(f"Batch {n}:" in output for n in (1, 2, 3))
+        with Session(engine) as session:
+            cat = session.query(TraderaCategory).filter_by(tradera_id=101).one()
+            assert cat.description == "Beskrivning 101"
+
+    def test_failed_request_keeps_done_batches_and_cancels_queued(self, engine):
+        import json
+        import re
+        import time
+        from datetime import UTC, datetime
+
+        from sqlalchemy.orm import Session
+
+        from storebot.db import TraderaCategory
+
+        with Session(engine) as session:
+            for tid in range(1, 351):
+                session.add(
+                    TraderaCategory(
+                        tradera_id=tid,
+                        name=f"Kategori {tid:03d}",
+                        path=f"Kategori {tid:03d}",
+                        depth=0,
+                        synced_at=datetime.now(UTC),
+                    )
+                )
+            session.commit()
+
+        requested = []
+
+        def _create(**kwargs):
+            ids = [int(i) for i in re.findall(r"- ID (\d+),", kwargs["messages"][0]["content"])]
+            requested.append(ids[0])
+            # Batch 1 answers at once, batch 2 fails once it has been handled;
+            # the others hold all four workers, so batch 7 stays queued.
+            if ids[0] == 51:
+                time.sleep(0.1)
+                raise RuntimeError("API down")
+            if ids[0] != 1:
+                time.sleep(0.3)
+            block = MagicMock()
+            block.type = "text"
+            block.text = json.dumps(
+                [{"tradera_id": i, "description": f"Beskrivning {i}"} for i in ids]
+            )
+            response = MagicMock()
+            response.content = [block]
+            return response
+
+        with patch("storebot.cli.anthropic.Anthropic") as mock_anthropic:
+            mock_anthropic.return_value.messages.create.side_effect = _create
+            with pytest.raises(RuntimeError, match="API down"):
+                generate_category_descriptions(engine, "test-key", "haiku")
+
+        assert 301 not in requested
+        with Session(engine) as session:
+            cat = session.query(TraderaCategory).filter_by(tradera_id=1).one()
+            assert cat.description == "Beskrivning 1"
+
 
 class TestSyncCategories:
-    @patch("storebot.cli.Settings")
-    def test_missing_app_id_exits(self, mock_settings_cls):
-        mock_settings_cls.return_value = _mock_settings(tradera_app_id="")
+    @patch("storebot.cli.get_settings")
+    def test_missing_app_id_exits(self, mock_get_settings):
+        mock_get_settings.return_value = _mock_settings(tradera_app_id="")
 
         with pytest.raises(SystemExit) as exc_info:
             sync_categories()
         assert exc_info.value.code == 1
 
-    @patch("storebot.cli.Settings")
-    def test_missing_app_key_exits(self, mock_settings_cls):
-        mock_settings_cls.return_value = _mock_settings(tradera_app_key="")
+    @patch("storebot.cli.get_settings")
+    def test_missing_app_key_exits(self, mock_get_settings):
+        mock_get_settings.return_value = _mock_settings(tradera_app_key="")
 
         with pytest.raises(SystemExit) as exc_info:
             sync_categories()
         assert exc_info.value.code == 1
 
-    @patch("storebot.cli.Settings")
-    def test_missing_claude_key_exits(self, mock_settings_cls):
+    @patch("storebot.cli.get_settings")
+    def test_missing_claude_key_exits(self, mock_get_settings):
         settings = _mock_settings()
         settings.claude_api_key = ""
-        mock_settings_cls.return_value = settings
+        mock_get_settings.return_value = settings
 
         with pytest.raises(SystemExit) as exc_info:
             sync_categories()
@@ -392,15 +492,15 @@ class TestSyncCategories:
     @patch("storebot.cli.generate_category_descriptions")
     @patch("storebot.cli.TraderaClient")
     @patch("storebot.cli.init_db")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     def test_successful_sync(
-        self, mock_settings_cls, mock_init_db, mock_tradera_cls, mock_gen_desc, capsys
+        self, mock_get_settings, mock_init_db, mock_tradera_cls, mock_gen_desc, capsys
     ):
         settings = _mock_settings()
         settings.claude_api_key = "test-key"
         settings.claude_model_simple = ""
         settings.claude_model_compact = "claude-haiku-3-5-20241022"
-        mock_settings_cls.return_value = settings
+        mock_get_settings.return_value = settings
 
         mock_engine = MagicMock()
         mock_init_db.return_value = mock_engine
@@ -423,7 +523,7 @@ class TestSyncCategories:
 class TestUpdateEnvFileCreatesNew:
     def test_creates_new_file_with_permissions(self, tmp_path):
         env_path = tmp_path / ".env"
-        _update_env_file(env_path, "MY_KEY", "my_value")
+        _update_env_file(env_path, {"MY_KEY": "my_value"})
         assert env_path.exists()
         assert env_path.read_text() == "MY_KEY=my_value\n"
         assert oct(env_path.stat().st_mode & 0o777) == "0o600"
@@ -431,18 +531,51 @@ class TestUpdateEnvFileCreatesNew:
     def test_appends_without_trailing_newline(self, tmp_path):
         env_path = tmp_path / ".env"
         env_path.write_text("EXISTING=value")  # no trailing newline
-        _update_env_file(env_path, "NEW_KEY", "new_value")
+        _update_env_file(env_path, {"NEW_KEY": "new_value"})
         content = env_path.read_text()
         assert "EXISTING=value\n" in content
         assert "NEW_KEY=new_value\n" in content
 
+    def test_updates_several_keys_in_one_write(self, tmp_path):
+        env_path = tmp_path / ".env"
+        env_path.write_text("A=1\nB=2\n")
+        _update_env_file(env_path, {"B": "3", "C": "4"})
+        assert env_path.read_text() == "A=1\nB=3\nC=4\n"
+
+    def test_replaces_file_without_leaving_temp(self, tmp_path):
+        env_path = tmp_path / ".env"
+        env_path.write_text("FOO=old\n")
+        _update_env_file(env_path, {"FOO": "new"})
+        assert env_path.read_text() == "FOO=new\n"
+        assert oct(env_path.stat().st_mode & 0o777) == "0o600"
+        assert [p.name for p in tmp_path.iterdir()] == [".env"]
+
+    def test_temp_file_private_and_removed_on_failure(self, tmp_path):
+        env_path = tmp_path / ".env"
+        env_path.write_text("FOO=old\n")
+        modes = []
+
+        def failing_replace(src, dst):
+            modes.append(oct(os.stat(src).st_mode & 0o777))
+            raise OSError("disk full")
+
+        with (
+            patch("storebot.cli.os.replace", side_effect=failing_replace),
+            pytest.raises(OSError),
+        ):
+            _update_env_file(env_path, {"FOO": "secret"})
+
+        assert modes == ["0o600"]
+        assert env_path.read_text() == "FOO=old\n"
+        assert [p.name for p in tmp_path.iterdir()] == [".env"]
+
 
 class TestAuthorizeTraderaErrorOutput:
     @patch("storebot.cli.TraderaClient")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
-    def test_error_without_repr(self, mock_input, mock_settings_cls, mock_tradera_cls, capsys):
-        mock_settings_cls.return_value = _mock_settings()
+    def test_error_without_repr(self, mock_input, mock_get_settings, mock_tradera_cls, capsys):
+        mock_get_settings.return_value = _mock_settings()
 
         mock_client = MagicMock()
         mock_client.fetch_token.return_value = {
@@ -464,12 +597,12 @@ class TestAuthorizeTraderaErrorOutput:
 
 class TestAuthorizeTraderaSaveWithoutUserId:
     @patch("storebot.cli.TraderaClient")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     @patch("builtins.input")
     def test_save_token_without_user_id(
-        self, mock_input, mock_settings_cls, mock_tradera_cls, tmp_path, monkeypatch, capsys
+        self, mock_input, mock_get_settings, mock_tradera_cls, tmp_path, monkeypatch, capsys
     ):
-        mock_settings_cls.return_value = _mock_settings()
+        mock_get_settings.return_value = _mock_settings()
 
         mock_client = MagicMock()
         mock_client.fetch_token.return_value = {
@@ -540,15 +673,15 @@ class TestSyncCategoriesRuntimeError:
     @patch("storebot.cli.generate_category_descriptions")
     @patch("storebot.cli.TraderaClient")
     @patch("storebot.cli.init_db")
-    @patch("storebot.cli.Settings")
+    @patch("storebot.cli.get_settings")
     def test_runtime_error_prints_error(
-        self, mock_settings_cls, mock_init_db, mock_tradera_cls, mock_gen_desc, capsys
+        self, mock_get_settings, mock_init_db, mock_tradera_cls, mock_gen_desc, capsys
     ):
         settings = _mock_settings()
         settings.claude_api_key = "test-key"
         settings.claude_model_simple = ""
         settings.claude_model_compact = "claude-haiku-3-5-20241022"
-        mock_settings_cls.return_value = settings
+        mock_get_settings.return_value = settings
 
         mock_init_db.return_value = MagicMock()
 
@@ -489,3 +489,95 @@ def test_load_history_truncation(engine):
     loaded = svc.load_history("chat1")
     # Should have truncated — only the most recent message should survive
     assert len(loaded) < len(messages)
+
+
+def test_load_history_served_from_cache(engine):
+    """A second load for the same chat does not hit the database."""
+    svc = ConversationService(engine)
+    svc.save_messages("chat1", [{"role": "user", "content": "Hej"}])
+    svc.load_history("chat1")
+
+    svc.engine = MagicMock()  # any DB access would now fail
+    history = svc.load_history("chat1")
+    assert history == [{"role": "user", "content": "Hej"}]
+
+
+def test_save_messages_appends_to_cached_history(engine):
+    svc = ConversationService(engine, max_messages=3)
+    svc.save_messages("chat1", [{"role": "user", "content": "Message 0"}])
+    svc.load_history("chat1")
+
+    svc.save_messages("chat1", [{"role": "user", "content": f"Message {i}"} for i in (1, 2, 3)])
+
+    history = svc.load_history("chat1")
+    assert [m["content"] for m in history] == ["Message 1", "Message 2", "Message 3"]
+    assert len(svc._cache["chat1"]) == 3
+
+
+def test_save_messages_extends_cached_window_in_place(engine):
+    svc = ConversationService(engine, max_messages=2)
+    svc.save_messages("chat1", [{"role": "user", "content": "Message 0"}])
+    svc.load_history("chat1")
+    window = svc._cache["chat1"]
+
+    svc.save_messages("chat1", [{"role": "user", "content": "Message 1"}])
+    svc.save_messages("chat1", [{"role": "user", "content": "Message 2"}])
+
+    assert svc._cache["chat1"] is window
+    assert [e.content for e in window] == ["Message 1", "Message 2"]
+
+
+def test_clear_and_replace_invalidate_cache(engine):
+    svc = ConversationService(engine)
+    svc.save_messages("chat1", [{"role": "user", "content": "Gammal"}])
+    svc.load_history("chat1")
+
+    svc.replace_history("chat1", [{"role": "user", "content": "Sammanfattning"}])
+    assert svc.load_history("chat1")[0]["content"] == "Sammanfattning"
+
+    svc.clear_history("chat1")
+    assert svc.load_history("chat1") == []
+
+
+def test_cache_evicts_least_recently_used_chat(engine):
+    svc = ConversationService(engine, cache_size=2)
+    for chat in ("a", "b", "c"):
+        svc.save_messages(chat, [{"role": "user", "content": chat}])
+        svc.load_history(chat)
+
+    assert list(svc._cache) == ["b", "c"]
+    assert svc.load_history("a")[0]["content"] == "a"
+
+
+def test_cached_history_respects_timeout(engine):
+    svc = ConversationService(engine, timeout_minutes=60)
+    svc.save_messages("chat1", [{"role": "user", "content": "Hej"}])
+    svc.load_history("chat1")
+
+    stale = svc._cache["chat1"][0]._replace(created_at=datetime.now(UTC) - timedelta(hours=2))
+    svc._cache["chat1"] = [stale]
+    assert svc.load_history("chat1") == []
+
+
+def test_mutating_loaded_history_does_not_touch_cache(engine):
+    svc = ConversationService(engine)
+    svc.save_messages("chat1", [{"role": "user", "content": [{"type": "text", "text": "Hej"}]}])
+
+    loaded = svc.load_history("chat1")
+    loaded[0]["content"][0]["text"] = "Ändrad"
+    loaded[0]["content"].append({"type": "text", "text": "Extra"})
+
+    assert svc.load_history("chat1") == [
+        {"role": "user", "content": [{"type": "text", "text": "Hej"}]}
+    ]
+
+
+def test_mutating_saved_message_does_not_touch_cache(engine):
+    svc = ConversationService(engine)
+    svc.load_history("chat1")
+    block = {"type": "text", "text": "Hej"}
+    svc.save_messages("chat1", [{"role": "user", "content": [block]}])
+
+    block["text"] = "Ändrad"
+
+    assert svc.load_history("chat1")[0]["content"] == [{"type": "text", "text": "Hej"}]
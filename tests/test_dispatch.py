@@ -1,5 +1,6 @@
 """Tests for shared tool dispatch logic."""
 
+import logging
 from unittest.mock import MagicMock
 
 import pytest
@@ -7,7 +8,11 @@ import sqlalchemy as sa
 
 from storebot.db import Base
 from storebot.tools.dispatch import (
+    _INPUT_SPECS,
     DISPATCH,
+    _compile_input_spec,
+    _input_error,
+    bind_handlers,
     create_services,
     execute_tool,
     strip_nulls,
@@ -135,7 +140,7 @@ class TestExecuteTool:
         mock_service = MagicMock()
         mock_service.search.return_value = {"items": []}
         services = {"tradera": mock_service}
-        result = execute_tool(services, "search_tradera", {"query": "test"})
+        result = execute_tool(bind_handlers(services), "search_tradera", {"query": "test"})
         mock_service.search.assert_called_once_with(query="test")
         assert result == {"items": []}
 
@@ -145,7 +150,7 @@ class TestExecuteTool:
 
     def test_missing_service_returns_error(self):
         services = {"listing": None}
-        result = execute_tool(services, "create_draft_listing", {})
+        result = execute_tool(bind_handlers(services), "create_draft_listing", {})
         assert "error" in result
         assert "not available" in result["error"]
 
@@ -153,7 +158,7 @@ class TestExecuteTool:
         mock_service = MagicMock()
         mock_service.search.return_value = {"items": []}
         services = {"tradera": mock_service}
-        execute_tool(services, "search_tradera", {"query": "test", "extra": None})
+        execute_tool(bind_handlers(services), "search_tradera", {"query": "test", "extra": None})
         mock_service.search.assert_called_once_with(query="test")
 
     def test_invalid_input_type_returns_error(self):
@@ -164,17 +169,109 @@ class TestExecuteTool:
         mock_service = MagicMock()
         mock_service.search.side_effect = TypeError("bad args")
         services = {"tradera": mock_service}
-        result = execute_tool(services, "search_tradera", {})
+        result = execute_tool(bind_handlers(services), "search_tradera", {"query": "test"})
         assert "error" in result
+        assert "bad args" in result["error"]
+        mock_service.search.assert_called_once_with(query="test")
 
     def test_exception_returns_error(self):
         mock_service = MagicMock()
         mock_service.search.side_effect = RuntimeError("boom")
         services = {"tradera": mock_service}
-        result = execute_tool(services, "search_tradera", {})
+        result = execute_tool(bind_handlers(services), "search_tradera", {"query": "test"})
         assert "error" in result
+        assert "boom" in result["error"]
+        mock_service.search.assert_called_once_with(query="test")
 
     def test_request_tools_returns_error(self):
         result = execute_tool({}, "request_tools", {})
         assert "error" in result
         assert "handle_message" in result["error"]
+
+
+class TestInputValidation:
+    def test_every_tool_has_a_spec(self):
+        assert set(DISPATCH) <= set(_INPUT_SPECS)
+
+    def test_missing_required_field_skips_service(self):
+        mock_service = MagicMock()
+        result = execute_tool(bind_handlers({"tradera": mock_service}), "search_tradera", {})
+        assert result == {
+            "error": "Invalid arguments for 'search_tradera': missing required field(s): query"
+        }
+        mock_service.search.assert_not_called()
+
+    def test_null_required_field_counts_as_missing(self):
+        mock_service = MagicMock()
+        handlers = bind_handlers({"tradera": mock_service})
+        result = execute_tool(handlers, "search_tradera", {"query": None})
+        assert "missing required field(s): query" in result["error"]
+
+    def test_unknown_field_rejected(self):
+        mock_service = MagicMock()
+        handlers = bind_handlers({"tradera": mock_service})
+        result = execute_tool(handlers, "search_tradera", {"query": "stol", "sort": "price"})
+        assert "unknown field(s): sort" in result["error"]
+        mock_service.search.assert_not_called()
+
+    def test_container_type_mismatch_rejected(self):
+        mock_service = MagicMock()
+        handlers = bind_handlers({"tradera": mock_service})
+        result = execute_tool(handlers, "search_tradera", {"query": ["stol"]})
+        assert "'query' must be string" in result["error"]
+        mock_service.search.assert_not_called()
+
+    def test_list_valued_type_accepts_any_listed_type(self):
+        spec = _compile_input_spec(
+            {"properties": {"tags": {"type": ["array", "null"]}, "note": {"type": "string"}}}
+        )
+        assert spec.types == (("tags", ("array", "null")), ("note", ("string",)))
+        assert _input_error(spec, {"tags": ["a"]}) is None
+        assert _input_error(spec, {"tags": None}) is None
+        assert _input_error(spec, {"tags": "a"}) == "'tags' must be array or null"
+        assert _input_error(spec, {"tags": {"a": 1}}) == "'tags' must be array or null"
+
+    def test_scalar_coercion_left_to_service(self):
+        mock_service = MagicMock()
+        mock_service.get_item.return_value = {"id": 42}
+        handlers = bind_handlers({"tradera": mock_service})
+        execute_tool(handlers, "get_tradera_item", {"item_id": "42"})
+        mock_service.get_item.assert_called_once_with(item_id="42")
+
+
+class TestExecuteToolLogging:
+    def test_debug_log_lists_keys_only(self, caplog):
+        mock_service = MagicMock()
+        mock_service.save_product_image.return_value = {"ok": True}
+        handlers = bind_handlers({"listing": mock_service})
+        with caplog.at_level(logging.DEBUG, logger="storebot.tools.dispatch"):
+            execute_tool(handlers, "save_product_image", {"product_id": 1, "data": "QUJD" * 100})
+        assert "['product_id', 'data']" in caplog.text
+        assert "QUJD" not in caplog.text
+
+    def test_no_debug_log_at_info(self, caplog):
+        handlers = bind_handlers({"blocket": MagicMock()})
+        with caplog.at_level(logging.INFO, logger="storebot.tools.dispatch"):
+            execute_tool(handlers, "search_blocket", {"query": "stol"})
+        assert "Executing tool" not in caplog.text
+
+
+class TestBindHandlers:
+    def test_covers_every_dispatch_entry(self):
+        handlers = bind_handlers({})
+        assert set(handlers) == set(DISPATCH)
+
+    def test_binds_service_methods(self):
+        mock_service = MagicMock()
+        handlers = bind_handlers({"blocket": mock_service})
+        assert handlers["search_blocket"] is mock_service.search
+
+    def test_missing_db_service_error_is_preformatted(self):
+        handlers = bind_handlers({"listing": None})
+        assert handlers["create_draft_listing"](title="x") == {
+            "error": "ListingService not available (no database engine)"
+        }
+
+    def test_missing_non_db_service_error(self):
+        handlers = bind_handlers({})
+        assert handlers["search_blocket"]() == {"error": "Service 'blocket' not available"}
@@ -1,5 +1,7 @@
 """Tests for storebot.bot.formatting — HTML escaping, Markdown→HTML, and message splitting."""
 
+from unittest.mock import patch
+
 from storebot.bot.formatting import (
     TELEGRAM_MAX_MESSAGE_LENGTH,
     html_escape,
@@ -78,10 +80,19 @@ class TestMarkdownToTelegramHtml:
         assert "<i>" not in result
         assert "**not bold**" in result
 
+    def test_multiple_code_blocks_keep_order(self):
+        md = "**A**\n```\nett\n```\nmellan\n```\ntvå\n```\n_B_"
+        result = markdown_to_telegram_html(md)
+        assert result == "<b>A</b>\n<pre>ett</pre>\nmellan\n<pre>två</pre>\n<i>B</i>"
+
     def test_inline_code_html_escaped(self):
         result = markdown_to_telegram_html("Kör `a < b`")
         assert "<code>a &lt; b</code>" in result
 
+    def test_multiple_inline_codes_restored_in_place(self):
+        result = markdown_to_telegram_html("`a` och **`b`** sen `c`")
+        assert result == "<code>a</code> och <b><code>b</code></b> sen <code>c</code>"
+
     def test_link(self):
         result = markdown_to_telegram_html("[Tradera](https://tradera.com)")
         assert '<a href="https://tradera.com">Tradera</a>' in result
@@ -113,6 +124,17 @@ class TestMarkdownToTelegramHtml:
         result = markdown_to_telegram_html("> Pris: 100 < 200 & moms")
         assert "<blockquote>Pris: 100 &lt; 200 &amp; moms</blockquote>" in result
 
+    def test_header_and_blockquote_lines_among_prose(self):
+        md = "## Rubrik\nText med # tecken\n> Citat\nSlut &gt; här"
+        result = markdown_to_telegram_html(md)
+        assert result == (
+            "<b>Rubrik</b>\nText med # tecken\n<blockquote>Citat</blockquote>\nSlut &amp;gt; här"
+        )
+
+    def test_bare_marker_does_not_swallow_next_line(self):
+        assert markdown_to_telegram_html("#\nText") == "#\nText"
+        assert markdown_to_telegram_html(">\nText") == "&gt;\nText"
+
     def test_strikethrough(self):
         result = markdown_to_telegram_html("~~struken~~")
         assert "<s>struken</s>" in result
@@ -178,6 +200,22 @@ class TestMarkdownToTelegramHtml:
         result = markdown_to_telegram_html(md)
         assert "\n\n" in result
 
+    def test_plain_text_returned_without_regex_passes(self):
+        text = "Ingen markdown här, bara vanlig text."
+        with patch("storebot.bot.formatting._FENCED_CODE_RE") as fenced_re:
+            assert markdown_to_telegram_html(text) is text
+        fenced_re.split.assert_not_called()
+
+    def test_passes_without_marker_skipped(self):
+        with (
+            patch("storebot.bot.formatting._LINK_RE") as link_re,
+            patch("storebot.bot.formatting._HEADER_RE") as header_re,
+        ):
+            result = markdown_to_telegram_html("Pris: 500 kr, **fast**")
+        assert result == "Pris: 500 kr, <b>fast</b>"
+        link_re.sub.assert_not_called()
+        header_re.fullmatch.assert_not_called()
+
 
 class TestSplitHtmlMessage:
     def test_short_message_as_is(self):
@@ -288,6 +326,26 @@ class TestSplitHtmlMessage:
         second_content = result[1].split("\n", 1)[1]
         assert '<a href="https://example.com">' in second_content
 
+    def test_tag_spanning_many_chunks_reopened_each_time(self):
+        words = " ".join(f"ord{i}" for i in range(3000))
+        text = f"<b>{words}</b>\n\nslut"
+        result = split_html_message(text)
+        assert len(result) >= 3
+        bodies = [part.split("\n", 1)[1] for part in result]
+        for body in bodies[:-1]:
+            assert body.startswith("<b>") and body.endswith("</b>")
+        assert bodies[-1].endswith("slut")
+        content = " ".join(strip_html_tags(body) for body in bodies)
+        assert content.split() == f"{words} slut".split()
+
+
+class TestHeaderLen:
+    def test_matches_rendered_header(self):
+        from storebot.bot.formatting import _header_len
+
+        for total in (1, 9, 10, 99, 100):
+            assert _header_len(total) == len(f"({total}/{total})\n")
+
 
 class TestGetOpenTags:
     def test_close_tag_pops_from_stack(self):
@@ -309,3 +367,36 @@ class TestGetOpenTags:
 
         result = _get_open_tags('<a href="http://x.com">link</a>')
         assert result == []
+
+    def test_close_before_open_does_not_cancel_it(self):
+        from storebot.bot.formatting import _get_open_tags
+
+        # A stray close tag must not pop a tag opened later in the text
+        result = _get_open_tags("x</b> och <b>fet")
+        assert result == ["<b>"]
+
+    def test_newline_before_attribute(self):
+        from storebot.bot.formatting import _get_open_tags
+
+        assert _get_open_tags('<a\nhref="https://x.se">länk</a>') == []
+        assert _get_open_tags('<b><a\nhref="https://x.se">länk') == [
+            "<b>",
+            '<a\nhref="https://x.se">',
+        ]
+
+
+class TestCloseTags:
+    def test_closes_in_reverse_order(self):
+        from storebot.bot.formatting import _close_tags
+
+        assert _close_tags(["<b>", '<a href="https://x.se">', "<i>"]) == "</i></a></b>"
+
+    def test_newline_before_attribute(self):
+        from storebot.bot.formatting import _close_tags
+
+        assert _close_tags(['<a\nhref="https://x.se">']) == "</a>"
+
+    def test_empty(self):
+        from storebot.bot.formatting import _close_tags
+
+        assert _close_tags([]) == ""
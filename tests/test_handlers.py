@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import threading
 import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -8,6 +10,7 @@ import telegram.error
 from storebot import __version__
 from storebot.bot.handlers import (
     _alert_admin,
+    _chat_locks,
     _check_access,
     _format_delta,
     _format_listing_dashboard,
@@ -19,6 +22,7 @@ from storebot.bot.handlers import (
     _reply,
     _send,
     _send_display_images,
+    _use_worker_pool,
     _validate_credentials,
     daily_listing_report_job,
     handle_photo,
@@ -113,6 +117,8 @@ class TestSendDisplayImages:
         update.message.reply_photo.assert_awaited_once()
         call_kwargs = update.message.reply_photo.call_args
         assert call_kwargs.kwargs["caption"] == "Bild 1 av 1 (huvudbild)"
+        assert call_kwargs.kwargs["photo"] == b"fake-jpeg"
+        assert call_kwargs.kwargs["filename"] == "test.jpg"
 
     @pytest.mark.asyncio
     async def test_no_op_on_empty_list(self):
@@ -529,6 +535,9 @@ class TestParseAllowedChatIds:
     def test_whitespace_handled(self):
         assert _parse_allowed_chat_ids("111, 222 , 333") == {111, 222, 333}
 
+    def test_result_is_frozen(self):
+        assert isinstance(_parse_allowed_chat_ids("111"), frozenset)
+
 
 # ---------------------------------------------------------------------------
 # _is_rate_limited
@@ -550,12 +559,45 @@ class TestIsRateLimited:
             rate_limit_window_seconds=60,
         )
         chat_id = 99990002
-        _rate_limit_buckets[chat_id] = [time.monotonic(), time.monotonic()]
+        _rate_limit_buckets.pop(chat_id, None)
         try:
+            assert _is_rate_limited(chat_id, settings) is False
+            assert _is_rate_limited(chat_id, settings) is False
             assert _is_rate_limited(chat_id, settings) is True
         finally:
             _rate_limit_buckets.pop(chat_id, None)
 
+    def test_least_recently_seen_chat_evicted_at_cap(self):
+        settings = Settings(telegram_bot_token="x", claude_api_key="x")
+        saved = _rate_limit_buckets.copy()
+        _rate_limit_buckets.clear()
+        try:
+            with patch("storebot.bot.handlers._RATE_LIMIT_MAX_CHATS", 2):
+                for chat_id in (1, 2, 1, 3):
+                    _is_rate_limited(chat_id, settings)
+            assert list(_rate_limit_buckets) == [1, 3]
+        finally:
+            _rate_limit_buckets.clear()
+            _rate_limit_buckets.update(saved)
+
+    def test_tokens_refill_over_window(self):
+        settings = Settings(
+            telegram_bot_token="x",
+            claude_api_key="x",
+            rate_limit_messages=2,
+            rate_limit_window_seconds=60,
+        )
+        chat_id = 99990004
+        _rate_limit_buckets[chat_id] = (0.0, 1000.0)
+        try:
+            with patch("storebot.bot.handlers.time.monotonic", return_value=1010.0):
+                assert _is_rate_limited(chat_id, settings) is True
+            # 2 tokens per 60 s: one token is back after 30 s
+            with patch("storebot.bot.handlers.time.monotonic", return_value=1040.0):
+                assert _is_rate_limited(chat_id, settings) is False
+        finally:
+            _rate_limit_buckets.pop(chat_id, None)
+
 
 # ---------------------------------------------------------------------------
 # _format_delta
@@ -666,6 +708,78 @@ class TestHandleWithConversation:
         calls = update.message.reply_text.call_args_list
         assert any("Något gick fel" in str(c) for c in calls)
 
+    @pytest.mark.asyncio
+    async def test_agent_runs_off_event_loop_thread(self):
+        update, context, agent, _, agent_response = self._make_mocks()
+        threads = []
+
+        def _handle(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return agent_response
+
+        agent.handle_message = MagicMock(side_effect=_handle)
+        await _handle_with_conversation(update, context, "hi")
+        assert threads and threads[0] is not threading.current_thread()
+
+    @pytest.mark.asyncio
+    async def test_same_chat_turns_do_not_overlap(self):
+        update, context, agent, _, agent_response = self._make_mocks()
+        active = []
+        overlapped = []
+
+        def _handle(*args, **kwargs):
+            active.append(1)
+            overlapped.append(len(active) > 1)
+            time.sleep(0.05)
+            active.pop()
+            return agent_response
+
+        agent.handle_message = MagicMock(side_effect=_handle)
+        await asyncio.gather(
+            _handle_with_conversation(update, context, "ett"),
+            _handle_with_conversation(update, context, "två"),
+        )
+        assert overlapped == [False, False]
+
+    @pytest.mark.asyncio
+    async def test_chat_lock_dropped_after_last_turn(self):
+        update, context, agent, _, agent_response = self._make_mocks()
+
+        def _handle(*args, **kwargs):
+            time.sleep(0.01)
+            return agent_response
+
+        agent.handle_message = MagicMock(side_effect=_handle)
+        await asyncio.gather(
+            *(_handle_with_conversation(update, context, str(i)) for i in range(3))
+        )
+        agent.handle_message.side_effect = RuntimeError("boom")
+        await _handle_with_conversation(update, context, "fel")
+        assert _chat_locks == {}
+
+    @pytest.mark.asyncio
+    async def test_new_conversation_waits_for_turn_in_flight(self):
+        update, context, agent, conversation, agent_response = self._make_mocks()
+        context.bot_data["settings"] = Settings(telegram_bot_token="x", claude_api_key="x")
+        context.bot_data["allowed_chat_ids"] = set()
+        calls = []
+        conversation.save_messages.side_effect = lambda *a: calls.append("save")
+        conversation.clear_history.side_effect = lambda *a: calls.append("clear")
+        started = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def _handle(*args, **kwargs):
+            loop.call_soon_threadsafe(started.set)
+            time.sleep(0.05)
+            return agent_response
+
+        agent.handle_message = MagicMock(side_effect=_handle)
+        turn = asyncio.create_task(_handle_with_conversation(update, context, "hi"))
+        await started.wait()
+        await new_conversation(update, context)
+        await turn
+        assert calls == ["save", "clear"]
+
     @pytest.mark.asyncio
     async def test_with_image_paths(self):
         update, context, agent, conversation, _ = self._make_mocks()
@@ -791,9 +905,50 @@ class TestHandlePhoto:
             "conversation": conversation,
         }
 
-        with patch("storebot.bot.handlers.resize_for_analysis", return_value="/tmp/resized.jpg"):
+        resize_threads = []
+
+        def _resize(path):
+            resize_threads.append(threading.current_thread())
+            return "/tmp/resized.jpg"
+
+        with patch("storebot.bot.handlers.resize_for_analysis", side_effect=_resize):
             await handle_photo(update, context)
         file_mock.download_to_drive.assert_awaited_once()
+        assert resize_threads and resize_threads[0] is not threading.current_thread()
+        assert agent.handle_message.call_args.kwargs["image_paths"] == ["/tmp/resized.jpg"]
+        assert (tmp_path / "photos").is_dir()
+
+    @pytest.mark.asyncio
+    async def test_download_failure_replies_with_error(self, tmp_path):
+        update = MagicMock()
+        update.effective_chat.id = 12345
+        update.message.reply_text = AsyncMock()
+        update.message.caption = None
+
+        photo = MagicMock()
+        file_mock = AsyncMock()
+        file_mock.file_unique_id = "abc123"
+        file_mock.download_to_drive = AsyncMock(side_effect=FileNotFoundError("gone"))
+        photo.get_file = AsyncMock(return_value=file_mock)
+        update.message.photo = [photo]
+
+        agent = MagicMock()
+        context = MagicMock()
+        context.bot_data = {
+            "settings": Settings(
+                telegram_bot_token="x",
+                claude_api_key="x",
+                product_image_dir=str(tmp_path / "photos"),
+            ),
+            "allowed_chat_ids": set(),
+            "agent": agent,
+            "conversation": MagicMock(),
+        }
+
+        await handle_photo(update, context)
+
+        assert "bildanalysen" in update.message.reply_text.call_args[0][0]
+        agent.handle_message.assert_not_called()
 
 
 class TestHandleText:
@@ -845,7 +1000,9 @@ class TestScoutCommand:
             "agent": agent,
         }
         await scout_command(update, context)
-        update.message.reply_text.assert_awaited()
+        replies = [c.args[0] for c in update.message.reply_text.call_args_list]
+        assert replies[0] == "Kör sparade sökningar…"
+        assert "Found items" in replies[-1]
 
     @pytest.mark.asyncio
     async def test_scout_no_service(self):
@@ -900,6 +1057,21 @@ class TestScoutDigestJob:
         await scout_digest_job(context)
         context.bot.send_message.assert_awaited_once()
 
+    @pytest.mark.asyncio
+    async def test_searches_run_off_event_loop_thread(self):
+        threads = []
+
+        def _run():
+            threads.append(threading.current_thread())
+            return {"total_new": 0}
+
+        agent = MagicMock()
+        agent.scout.run_all_searches = MagicMock(side_effect=_run)
+        context = MagicMock()
+        context.bot_data = {"agent": agent, "owner_chat_id": 12345}
+        await scout_digest_job(context)
+        assert threads and threads[0] is not threading.current_thread()
+
     @pytest.mark.asyncio
     async def test_no_new_items_skips(self):
         scout = MagicMock()
@@ -968,6 +1140,29 @@ class TestRapportCommand:
         await rapport_command(update, context)
         update.message.reply_text.assert_awaited()
 
+    @pytest.mark.asyncio
+    async def test_rapport_passes_results_in_order(self):
+        update = MagicMock()
+        update.effective_chat.id = 12345
+        update.message.reply_text = AsyncMock()
+        analytics = MagicMock()
+        analytics.business_summary = MagicMock(return_value={"k": "summary"})
+        analytics.profitability_report = MagicMock(return_value={"k": "profit"})
+        analytics.inventory_report = MagicMock(return_value={"k": "inventory"})
+        analytics._format_full_report = MagicMock(return_value="Report text")
+        agent = MagicMock()
+        agent.analytics = analytics
+        context = MagicMock()
+        context.bot_data = {
+            "settings": Settings(telegram_bot_token="x", claude_api_key="x"),
+            "allowed_chat_ids": set(),
+            "agent": agent,
+        }
+        await rapport_command(update, context)
+        analytics._format_full_report.assert_called_once_with(
+            {"k": "summary"}, {"k": "profit"}, {"k": "inventory"}
+        )
+
     @pytest.mark.asyncio
     async def test_rapport_no_analytics(self):
         update = MagicMock()
@@ -1050,6 +1245,25 @@ class TestWeeklyComparisonJob:
         await weekly_comparison_job(context)
         context.bot.send_message.assert_awaited()
 
+    @pytest.mark.asyncio
+    async def test_comparison_runs_off_event_loop_thread(self):
+        threads = []
+
+        def _compare():
+            threads.append(threading.current_thread())
+            return {}
+
+        analytics = MagicMock()
+        analytics.period_comparison = MagicMock(side_effect=_compare)
+        analytics._format_comparison = MagicMock(return_value="Weekly text")
+        agent = MagicMock()
+        agent.analytics = analytics
+        context = MagicMock()
+        context.bot_data = {"agent": agent, "owner_chat_id": 12345}
+        context.bot.send_message = AsyncMock()
+        await weekly_comparison_job(context)
+        assert threads and threads[0] is not threading.current_thread()
+
 
 class TestMarketingCommand:
     @pytest.mark.asyncio
@@ -1244,6 +1458,27 @@ class TestPollOrdersJob:
         text = context.bot.send_message.call_args.kwargs["text"]
         assert "Ny order" in text
 
+    @pytest.mark.asyncio
+    async def test_multiple_orders_sent_as_one_message(self):
+        order = MagicMock()
+        order.check_new_orders = MagicMock(
+            return_value={
+                "new_orders": [
+                    {"order_id": 42, "product_id": 1, "sale_price": 500},
+                    {"order_id": 43, "product_id": 2, "sale_price": 750},
+                ]
+            }
+        )
+        agent = MagicMock()
+        agent.order = order
+        context = MagicMock()
+        context.bot_data = {"agent": agent, "owner_chat_id": 12345}
+        context.bot.send_message = AsyncMock()
+        await poll_orders_job(context)
+        context.bot.send_message.assert_awaited_once()
+        text = context.bot.send_message.call_args.kwargs["text"]
+        assert "#42" in text and "#43" in text
+
     @pytest.mark.asyncio
     async def test_no_new_orders_skips(self):
         order = MagicMock()
@@ -1399,6 +1634,14 @@ class TestCheckExpiredListingsJob:
         context.bot.send_message.assert_awaited()
 
 
+class TestUseWorkerPool:
+    @pytest.mark.asyncio
+    async def test_to_thread_runs_on_named_pool(self):
+        await _use_worker_pool(MagicMock())
+        name = await asyncio.to_thread(lambda: threading.current_thread().name)
+        assert name.startswith("storebot-worker")
+
+
 # ---------------------------------------------------------------------------
 # main()
 # ---------------------------------------------------------------------------
@@ -1418,6 +1661,7 @@ class TestMain:
         mock_settings.log_json = False
         mock_settings.log_file = ""
         mock_settings.max_history_messages = 50
+        mock_settings.compact_threshold = 16
         mock_settings.conversation_timeout_minutes = 60
         mock_settings.order_poll_interval_minutes = 30
         mock_settings.scout_digest_hour = 7
@@ -1440,11 +1684,13 @@ class TestMain:
             patch("storebot.bot.handlers.Application") as MockApplication,
         ):
             mock_builder = MagicMock()
-            mock_builder.token.return_value.build.return_value = mock_app
+            configured = mock_builder.token.return_value.concurrent_updates.return_value
+            configured.post_init.return_value.build.return_value = mock_app
             MockApplication.builder.return_value = mock_builder
 
             main()
 
+            configured.post_init.assert_called_once_with(_use_worker_pool)
             mock_app.run_polling.assert_called_once()
             mock_app.add_handler.assert_called()
             assert mock_job_queue.run_repeating.call_count == 2
@@ -1458,6 +1704,17 @@ class TestMain:
                 repricing_check_job,
                 weekly_comparison_job,
             }
+            report_call = next(
+                c
+                for c in mock_job_queue.run_daily.call_args_list
+                if c.args[0] is daily_listing_report_job
+            )
+            assert report_call.kwargs["time"].minute == 15
+            scheduled = (
+                mock_job_queue.run_repeating.call_args_list
+                + mock_job_queue.run_daily.call_args_list
+            )
+            assert all(c.kwargs["job_kwargs"]["max_instances"] == 1 for c in scheduled)
 
     def test_main_warns_empty_allowed_chat_ids(self, caplog):
         """Startup logs warning when ALLOWED_CHAT_IDS is empty (dev mode)."""
@@ -1472,6 +1729,7 @@ class TestMain:
         mock_settings.log_json = False
         mock_settings.log_file = ""
         mock_settings.max_history_messages = 50
+        mock_settings.compact_threshold = 16
         mock_settings.conversation_timeout_minutes = 60
         mock_settings.order_poll_interval_minutes = 30
         mock_settings.scout_digest_hour = 7
@@ -1494,13 +1752,58 @@ class TestMain:
             caplog.at_level(logging.WARNING, logger="storebot.bot.handlers"),
         ):
             mock_builder = MagicMock()
-            mock_builder.token.return_value.build.return_value = mock_app
+            configured = mock_builder.token.return_value.concurrent_updates.return_value
+            configured.post_init.return_value.build.return_value = mock_app
             MockApplication.builder.return_value = mock_builder
 
             main()
 
             assert any("ALLOWED_CHAT_IDS is empty" in r.message for r in caplog.records)
 
+    def test_main_warns_compact_threshold_not_below_history(self, caplog):
+        """Startup warns when compaction can never trigger within the history window."""
+        mock_settings = MagicMock(spec=Settings)
+        mock_settings.telegram_bot_token = "test-token"
+        mock_settings.claude_api_key = "test-key"
+        mock_settings.tradera_app_id = ""
+        mock_settings.tradera_app_key = ""
+        mock_settings.postnord_api_key = ""
+        mock_settings.allowed_chat_ids = ""
+        mock_settings.log_level = "INFO"
+        mock_settings.log_json = False
+        mock_settings.log_file = ""
+        mock_settings.max_history_messages = 50
+        mock_settings.compact_threshold = 50
+        mock_settings.conversation_timeout_minutes = 60
+        mock_settings.order_poll_interval_minutes = 30
+        mock_settings.scout_digest_hour = 7
+        mock_settings.marketing_refresh_hour = 8
+        mock_settings.listing_report_hour = 7
+        mock_settings.repricing_check_hour = 9
+        mock_settings.expired_listings_check_interval_minutes = 60
+
+        mock_app = MagicMock()
+        mock_app.bot_data = {}
+        mock_app.job_queue = MagicMock()
+
+        with (
+            patch("storebot.bot.handlers.get_settings", return_value=mock_settings),
+            patch("storebot.bot.handlers.init_db", return_value=MagicMock()),
+            patch("storebot.bot.handlers.configure_logging"),
+            patch("storebot.bot.handlers.Agent", return_value=MagicMock()),
+            patch("storebot.bot.handlers.ConversationService", return_value=MagicMock()),
+            patch("storebot.bot.handlers.Application") as MockApplication,
+            caplog.at_level(logging.WARNING, logger="storebot.bot.handlers"),
+        ):
+            mock_builder = MagicMock()
+            configured = mock_builder.token.return_value.concurrent_updates.return_value
+            configured.post_init.return_value.build.return_value = mock_app
+            MockApplication.builder.return_value = mock_builder
+
+            main()
+
+            assert any("COMPACT_THRESHOLD" in r.message for r in caplog.records)
+
 
 # ---------------------------------------------------------------------------
 # _check_access denial path for each command handler
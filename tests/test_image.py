@@ -1,4 +1,5 @@
 import base64
+import io
 import os
 
 from PIL import Image
@@ -148,3 +149,14 @@ class TestEncodeImageBase64:
             f.write(decoded)
         img = Image.open(tmp_path / "decoded.jpg")
         assert img.size == (100, 100)
+
+    def test_cached_until_file_changes(self, tmp_path):
+        src = _create_test_image(tmp_path / "cached.jpg", size=(100, 100))
+        first, _ = encode_image_base64(src)
+        assert encode_image_base64(src)[0] is first
+
+        Image.new("RGB", (50, 50), color="green").save(src)
+        os.utime(src, ns=(0, 0))
+        changed, _ = encode_image_base64(src)
+        assert changed != first
+        assert Image.open(io.BytesIO(base64.b64decode(changed))).size == (50, 50)
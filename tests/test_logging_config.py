@@ -126,6 +126,17 @@ class TestConfigureLogging:
         assert len(root.handlers) == 1
         assert not isinstance(root.handlers[0].formatter, JSONFormatter)
 
+    def test_library_loggers_quieted_at_info(self):
+        configure_logging(level="INFO", json_format=True)
+
+        assert logging.getLogger("httpx").getEffectiveLevel() == logging.WARNING
+        assert logging.getLogger("apscheduler").getEffectiveLevel() == logging.WARNING
+
+    def test_library_loggers_follow_root_at_debug(self):
+        configure_logging(level="DEBUG", json_format=True)
+
+        assert logging.getLogger("httpx").getEffectiveLevel() == logging.DEBUG
+
     def test_clears_existing_handlers(self):
         root = logging.getLogger()
         root.addHandler(logging.StreamHandler())
@@ -100,6 +100,27 @@ class TestCreateServer:
         parsed = json.loads(result.root.content[0].text)
         assert parsed == {"items": []}
 
+    def test_call_tool_result_keeps_unicode(self):
+        mock_tradera = MagicMock()
+        mock_tradera.search.return_value = {"items": [{"title": "Köksstol"}]}
+        server = _create_server({"tradera": mock_tradera})
+
+        from mcp import types
+
+        async def _run():
+            return await server.request_handlers[types.CallToolRequest](
+                types.CallToolRequest(
+                    method="tools/call",
+                    params=types.CallToolRequestParams(
+                        name="search_tradera",
+                        arguments={"query": "stol"},
+                    ),
+                )
+            )
+
+        result = asyncio.run(_run())
+        assert result.root.content[0].text == '{"items":[{"title":"Köksstol"}]}'
+
     def test_call_unknown_tool(self):
         services = {}
         server = _create_server(services)
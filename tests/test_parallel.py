@@ -77,7 +77,7 @@ def _make_tool_response(tool_blocks):
 
 class TestSingleToolNoThreading:
     def test_single_tool_uses_sequential_path(self, engine):
-        """1 tool block should NOT use ThreadPoolExecutor."""
+        """1 tool block should NOT use the tool pool."""
         agent = _make_agent(engine)
 
         tool_block = _make_tool_block("search_tradera", {"query": "stol"}, "t1")
@@ -86,9 +86,9 @@ class TestSingleToolNoThreading:
         agent._call_api = MagicMock(side_effect=[resp1, resp2])
         agent.execute_tool = MagicMock(return_value={"results": [], "total_count": 0})
 
-        with patch("storebot.agent.ThreadPoolExecutor") as mock_pool:
+        with patch.object(agent._tool_pool, "map") as mock_map:
             agent.handle_message("sök stol")
-            mock_pool.assert_not_called()
+            mock_map.assert_not_called()
 
         agent.execute_tool.assert_called_once_with("search_tradera", {"query": "stol"})
 
@@ -184,8 +184,10 @@ class TestParallelExecution:
         assert agent.execute_tool.call_count == 2
 
     def test_max_workers_capped_at_four(self, engine):
-        """6 tool blocks should cap max_workers at 4."""
-        agent = _make_agent(engine)
+        """6 tool blocks should run on the agent's 4-worker pool."""
+        with patch("storebot.agent.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as mock_pool:
+            agent = _make_agent(engine)
+        mock_pool.assert_called_once_with(max_workers=4, thread_name_prefix="storebot-tool")
 
         blocks = [_make_tool_block(f"tool_{i}", {}, f"t{i}") for i in range(6)]
         resp1 = _make_tool_response(blocks)
@@ -193,9 +195,8 @@ class TestParallelExecution:
         agent._call_api = MagicMock(side_effect=[resp1, resp2])
         agent.execute_tool = MagicMock(return_value={"ok": True})
 
-        with patch("storebot.agent.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as mock_pool:
-            agent.handle_message("gör allt")
-            mock_pool.assert_called_once_with(max_workers=4)
+        agent.handle_message("gör allt")
+        assert agent.execute_tool.call_count == 6
 
     def test_parallel_all_tools_executed(self, engine):
         """3 tool blocks should all be executed."""
@@ -215,3 +216,56 @@ class TestParallelExecution:
         assert agent.execute_tool.call_count == 3
         called_names = [call.args[0] for call in agent.execute_tool.call_args_list]
         assert set(called_names) == {"search_tradera", "search_blocket", "price_check"}
+
+
+class TestToolExceptionCapture:
+    @pytest.mark.parametrize("count", [1, 2])
+    def test_raising_tool_still_gets_tool_result(self, engine, count):
+        """An exception escaping execute_tool becomes an error tool_result on both paths."""
+        agent = _make_agent(engine)
+
+        blocks = [_make_tool_block("get_categories", {}, f"t{i}") for i in range(count)]
+        resp1 = _make_tool_response(blocks)
+        resp2 = _make_text_response()
+        agent._call_api = MagicMock(side_effect=[resp1, resp2])
+        agent.execute_tool = MagicMock(side_effect=RuntimeError("db locked"))
+
+        result = agent.handle_message("kategorier")
+
+        assert result.text == "Klart."
+        tool_results = result.messages[2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == [f"t{i}" for i in range(count)]
+        assert all("db locked" in r["content"] for r in tool_results)
+
+
+class TestSerialTools:
+    def test_two_side_effecting_tools_run_in_order_without_pool(self, engine):
+        agent = _make_agent(engine)
+
+        block_a = _make_tool_block("create_shipping_label", {"order_id": 1}, "ta")
+        block_b = _make_tool_block("mark_order_shipped", {"order_id": 1}, "tb")
+        resp1 = _make_tool_response([block_a, block_b])
+        resp2 = _make_text_response()
+        agent._call_api = MagicMock(side_effect=[resp1, resp2])
+        agent.execute_tool = MagicMock(return_value={"ok": True})
+
+        with patch.object(agent._tool_pool, "map") as mock_map:
+            agent.handle_message("skicka order 1")
+            mock_map.assert_not_called()
+
+        assert [c.args[0] for c in agent.execute_tool.call_args_list] == [
+            "create_shipping_label",
+            "mark_order_shipped",
+        ]
+
+    def test_serial_tool_holds_lock(self, engine):
+        agent = _make_agent(engine)
+        held = []
+        agent.execute_tool = MagicMock(
+            side_effect=lambda name, inp: held.append(agent._serial_tool_lock.locked())
+        )
+
+        agent._execute_tool_safely("publish_listing", {"listing_id": 1})
+        agent._execute_tool_safely("search_tradera", {"query": "stol"})
+
+        assert held == [True, False]
@@ -54,6 +54,11 @@ class TestPostNordClientInit:
         client = PostNordClient(api_key="key", sender=sender, sandbox=False)
         assert client.base_url == PRODUCTION_URL
 
+    def test_session_created_lazily(self, sender):
+        client = PostNordClient(api_key="key", sender=sender)
+        assert "session" not in vars(client)
+        assert client.session is client.session
+
 
 class TestBuildPayload:
     def test_payload_structure(self, client, recipient):
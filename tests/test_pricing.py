@@ -1,3 +1,4 @@
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -136,6 +137,37 @@ class TestPriceCheck:
 
         assert result["product_id"] == 42
 
+    def test_searches_run_concurrently(self, service, tradera, blocket):
+        """Each search waits for the other to start, so a serial run would deadlock."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def _search(**kwargs):
+            barrier.wait()
+            return {"items": []}
+
+        tradera.search.side_effect = _search
+        blocket.search.side_effect = _search
+
+        result = service.price_check("stol")
+
+        assert "error" not in result["tradera"]
+        assert "error" not in result["blocket"]
+
+    def test_tradera_search_thread_outlives_the_call(self, service, tradera, blocket):
+        threads = []
+
+        def _search(**kwargs):
+            threads.append(threading.current_thread())
+            return {"items": []}
+
+        tradera.search.side_effect = _search
+        blocket.search.return_value = {"items": []}
+
+        service.price_check("stol")
+        service.price_check("bord")
+
+        assert all(t.name.startswith("storebot-pricing") and t.is_alive() for t in threads)
+
 
 class TestComputeStats:
     def test_normal_prices(self):
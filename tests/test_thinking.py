@@ -21,6 +21,7 @@ def _make_settings(**overrides):
     settings = MagicMock()
     settings.claude_api_key = "test"
     settings.claude_model = "claude-sonnet-4-6"
+    settings.claude_model_simple = ""
     settings.claude_max_tokens = 16000
     settings.claude_thinking_budget = 0
     settings.tradera_app_id = "1"
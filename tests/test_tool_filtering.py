@@ -38,6 +38,33 @@ def _make_agent(engine):
     return Agent(settings=settings, engine=engine)
 
 
+# --- TOOLS definitions ---
+
+
+class TestToolDefinitions:
+    def test_tools_is_immutable_sequence(self):
+        assert isinstance(TOOLS, tuple)
+
+    @pytest.mark.parametrize(
+        ("prop", "tools"),
+        [
+            (
+                "listing_type",
+                ["create_draft_listing", "update_draft_listing", "relist_product"],
+            ),
+            (
+                "duration_days",
+                ["create_draft_listing", "update_draft_listing", "relist_product"],
+            ),
+            ("platform", ["create_saved_search", "update_saved_search"]),
+        ],
+    )
+    def test_enum_list_shared_between_tools(self, prop, tools):
+        by_name = {t["name"]: t for t in TOOLS}
+        enums = [by_name[name]["input_schema"]["properties"][prop]["enum"] for name in tools]
+        assert all(e is enums[0] for e in enums)
+
+
 # --- _detect_categories tests ---
 
 
@@ -165,6 +192,13 @@ class TestGetFilteredTools:
         for t in tools:
             assert "category" not in t
 
+    def test_same_categories_reuse_tool_dicts(self):
+        first = _get_filtered_tools({"core", "listing"})
+        second = _get_filtered_tools({"listing", "core"})
+        assert first == second
+        assert first is not second
+        assert all(a is b for a, b in zip(first, second))
+
 
 # --- request_tools integration tests ---
 
@@ -209,7 +243,7 @@ class TestRequestTools:
 
         call_args_list = []
 
-        def mock_call_api(messages, tools=None, model=None):
+        def mock_call_api(messages, tools=None, model=None, history_len=0):
             call_args_list.append({"messages": messages, "tools": tools})
             if len(call_args_list) == 1:
                 return resp1
@@ -301,7 +335,7 @@ class TestRequestTools:
 
         call_args_list = []
 
-        def mock_call_api(messages, tools=None, model=None):
+        def mock_call_api(messages, tools=None, model=None, history_len=0):
             call_args_list.append(tools)
             return resp
 
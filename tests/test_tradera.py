@@ -1,4 +1,5 @@
 import json
+import threading
 from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
@@ -381,6 +382,41 @@ class TestAuthHeaders:
         assert len(headers["_soapheaders"]) == 3
 
 
+class TestTransport:
+    def test_services_share_one_http_session(self, client):
+        first = client._make_transport()
+        second = client._make_transport()
+        assert first.session is second.session
+        assert first.session.timeout == client.timeout
+
+    def test_each_thread_gets_its_own_session(self, client):
+        transport = client._make_transport()
+        other = []
+        worker = threading.Thread(target=lambda: other.append(transport.session))
+        worker.start()
+        worker.join()
+        assert other[0] is not transport.session
+        assert client._make_transport().session is transport.session
+
+    def test_thread_sessions_get_zeep_setup(self, client):
+        transport = client._make_transport()
+        other = []
+        worker = threading.Thread(target=lambda: other.append(transport.session))
+        worker.start()
+        worker.join()
+        assert other[0].headers["User-Agent"] == transport.session.headers["User-Agent"]
+        assert other[0].headers["User-Agent"].startswith("Zeep/")
+        assert "file://" in other[0].adapters
+
+    def test_new_session_set_up_without_transport(self, client):
+        with patch("storebot.tools.tradera.Transport") as transport_cls:
+            session = client._new_session()
+        transport_cls.assert_not_called()
+        assert session.timeout == client.timeout
+        assert session.headers["User-Agent"].startswith("Zeep/")
+        assert "file://" in session.adapters
+
+
 class TestTraderaCreateListing:
     def test_auction_listing(self, client):
         response = MagicMock()
@@ -782,6 +818,20 @@ class TestGetAttributeDefinitions:
         assert result["attributes"][0]["possible_values"] == ["Nytt", "Bra skick", "Slitage"]
 
 
+def _one_option_roster():
+    """GetShippingOptions response holding a single 1 kg PostNord product."""
+    prod = MagicMock()
+    prod.Id = 10
+    prod.Price = Decimal("59.00")
+    prod.VatPercent = Decimal("25.00")
+    span = MagicMock()
+    span.Weight = Decimal("1.000")
+    span.Products = MagicMock(Product=[prod])
+    response = MagicMock()
+    response.ProductsPerWeightSpan = MagicMock(ProductsPerWeightSpan=[span])
+    return response
+
+
 class TestGetShippingOptions:
     def test_returns_parsed_options(self, client):
         # Mock matches actual WSDL Product type field names
@@ -961,6 +1011,55 @@ class TestGetShippingOptions:
         assert opt["max_length_cm"] == 60.0
         assert isinstance(opt["cost"], float)
 
+    def test_roster_cached_per_country(self, client):
+        service = client._public_client.service
+        service.GetShippingOptions.return_value = _one_option_roster()
+
+        client.get_shipping_options()
+        client.get_shipping_options(weight_grams=500)
+        assert service.GetShippingOptions.call_count == 1
+
+        client.get_shipping_options(from_country="NO")
+        assert service.GetShippingOptions.call_count == 2
+
+    def test_roster_refetched_after_ttl(self, client):
+        service = client._public_client.service
+        service.GetShippingOptions.return_value = _one_option_roster()
+
+        with patch("storebot.tools.tradera.time.monotonic", side_effect=[0.0, 3601.0]):
+            client.get_shipping_options()
+            client.get_shipping_options()
+
+        assert service.GetShippingOptions.call_count == 2
+
+    def test_errors_not_cached(self, client):
+        response = MagicMock()
+        response.ProductsPerWeightSpan = None
+        service = client._public_client.service
+        service.GetShippingOptions.side_effect = [Exception("Timeout"), response]
+
+        assert client.get_shipping_options()["error"] == "Timeout"
+        assert client.get_shipping_options() == {"shipping_options": []}
+
+    def test_empty_roster_not_cached(self, client):
+        empty = MagicMock()
+        empty.ProductsPerWeightSpan = None
+        service = client._public_client.service
+        service.GetShippingOptions.side_effect = [empty, _one_option_roster()]
+
+        assert client.get_shipping_options() == {"shipping_options": []}
+        assert len(client.get_shipping_options()["shipping_options"]) == 1
+        assert service.GetShippingOptions.call_count == 2
+
+    def test_mutating_result_does_not_touch_cache(self, client):
+        service = client._public_client.service
+        service.GetShippingOptions.return_value = _one_option_roster()
+
+        client.get_shipping_options()["shipping_options"][0]["cost"] = 0.0
+        client.get_shipping_options(weight_grams=500)["shipping_options"][0]["cost"] = 0.0
+
+        assert client.get_shipping_options()["shipping_options"][0]["cost"] == 59.0
+
 
 class TestGetShippingTypes:
     def test_returns_types(self, client):